@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_store import ResultStore, entity_key
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_state (
+    entity_key TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    verdict TEXT,
+    score REAL,
+    sentiment INTEGER,
+    price_band INTEGER,
+    fired TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+RULES = ("first_result", "verdict_change", "score_delta", "sentiment_flip", "price_band")
+SENTIMENT_SIDE = {"VERY BULLISH": 1, "BULLISH": 1, "NEUTRAL": 0, "BEARISH": -1, "VERY BEARISH": -1}
+
+
+@dataclass(frozen=True)
+class AlertRules:
+    enabled: bool = True
+    first_result: bool = True
+    verdict_change: bool = True
+    score_delta: float = 10.0
+    sentiment_flip: bool = True
+    # Breakpoints on the 7-day price change (%); crossing into another band is an alert.
+    price_bands: Tuple[float, ...] = (-15.0, -5.0, 5.0, 15.0)
+    cooldown_seconds: float = 3600.0
+    cooldowns: Dict[str, float] = field(default_factory=dict)
+
+    def cooldown(self, rule: str) -> float:
+        return self.cooldowns.get(rule, self.cooldown_seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["price_bands"] = list(self.price_bands)
+        return out
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in {"1", "true", "yes", "on"}:
+        return True
+    if text in {"0", "false", "no", "off", ""}:
+        return False
+    raise ValueError("expected a boolean")
+
+
+def _seconds(value: Any) -> float:
+    number = float(value)
+    if not 0 <= number <= 30 * 86400:
+        raise ValueError("expected seconds between 0 and 2592000")
+    return number
+
+
+def parse_rules(raw: Any) -> AlertRules:
+    # Used by settings_store for validation: raises ValueError, missing keys keep their defaults.
+    if raw is None:
+        return AlertRules()
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object")
+    changes: Dict[str, Any] = {}
+    for key in ("enabled", "first_result", "verdict_change", "sentiment_flip"):
+        if key in raw:
+            changes[key] = _flag(raw[key])
+    if "score_delta" in raw:
+        # 0 or null switches the rule off.
+        delta = float(raw["score_delta"] or 0)
+        if not 0 <= delta <= 100:
+            raise ValueError("score_delta must be between 0 and 100")
+        changes["score_delta"] = delta
+    if "price_bands" in raw:
+        bands = raw["price_bands"] or []
+        if not isinstance(bands, (list, tuple)) or len(bands) > 16:
+            raise ValueError("price_bands must be a list of at most 16 percentages")
+        changes["price_bands"] = tuple(sorted({float(b) for b in bands}))
+    if "cooldown_seconds" in raw:
+        changes["cooldown_seconds"] = _seconds(raw["cooldown_seconds"])
+    if "cooldowns" in raw:
+        cooldowns = raw["cooldowns"] or {}
+        if not isinstance(cooldowns, dict) or set(cooldowns) - set(RULES):
+            raise ValueError(f"cooldowns keys must be among {', '.join(RULES)}")
+        changes["cooldowns"] = {k: _seconds(v) for k, v in cooldowns.items()}
+    return AlertRules(**changes)
+
+
+def _snapshot(result: Dict[str, Any], rules: AlertRules) -> Dict[str, Any]:
+    change = (result.get("financials") or {}).get("price_change_7d")
+    return {
+        "mode": str(result.get("mode") or ""),
+        "verdict": result.get("verdict"),
+        "score": float(result["score"]) if isinstance(result.get("score"), (int, float)) else None,
+        "sentiment": SENTIMENT_SIDE.get(str((result.get("social") or {}).get("sentiment") or "").upper()),
+        "price_band": (
+            bisect.bisect_right(rules.price_bands, float(change)) if isinstance(change, (int, float)) else None
+        ),
+    }
+
+
+def match(previous: Optional[Dict[str, Any]], current: Dict[str, Any], rules: AlertRules) -> List[Tuple[str, str]]:
+    # Pure comparison of two compact snapshots: constant work per result, however long the history is.
+    if previous is None or previous["mode"] != current["mode"]:
+        return [("first_result", "first result")] if rules.first_result else []
+    hits: List[Tuple[str, str]] = []
+    if rules.verdict_change and current["verdict"] != previous["verdict"]:
+        hits.append(("verdict_change", f"verdict {previous['verdict']} -> {current['verdict']}"))
+    if rules.score_delta and current["score"] is not None and previous["score"] is not None:
+        delta = current["score"] - previous["score"]
+        if abs(delta) >= rules.score_delta:
+            hits.append(("score_delta", f"score {delta:+.0f} ({previous['score']:.0f} -> {current['score']:.0f})"))
+    if rules.sentiment_flip and (current["sentiment"] or 0) * (previous["sentiment"] or 0) < 0:
+        hits.append(("sentiment_flip", "sentiment flipped " + ("bullish" if current["sentiment"] > 0 else "bearish")))
+    if rules.price_bands and None not in (current["price_band"], previous["price_band"]):
+        if current["price_band"] != previous["price_band"]:
+            direction = "up" if current["price_band"] > previous["price_band"] else "down"
+            hits.append(("price_band", f"7d price change moved {direction} a band"))
+    return hits
+
+
+class AlertEngine:
+    def __init__(self, store: ResultStore) -> None:
+        self.store = store
+        self._schema_pid: Optional[int] = None
+        self.evaluated = 0
+        self.fired = 0
+        self.suppressed = 0
+
+    def _ensure_schema(self) -> None:
+        if self._schema_pid != os.getpid():
+            self.store.conn.executescript(SCHEMA)
+            self._schema_pid = os.getpid()
+
+    def evaluate(
+        self, result: Dict[str, Any], rules: AlertRules, deliver: bool = True, now: Optional[float] = None
+    ) -> List[str]:
+        # One primary-key read and one upsert per result; the state row always moves to the newest result,
+        # while cooldowns only advance for rules that actually produced an alert.
+        key = entity_key(result.get("entity"))
+        if not key or not rules.enabled:
+            return []
+        self._ensure_schema()
+        now = time.time() if now is None else now
+        current = _snapshot(result, rules)
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT mode, verdict, score, sentiment, price_band, fired FROM alert_state WHERE entity_key = ?",
+                (key,),
+            ).fetchone()
+            previous = None
+            fired: Dict[str, float] = {}
+            if row is not None:
+                previous = dict(zip(("mode", "verdict", "score", "sentiment", "price_band"), row[:5]))
+                fired = json.loads(row[5] or "{}")
+            reasons: List[str] = []
+            for rule, reason in match(previous, current, rules):
+                if rule in fired and now - fired[rule] < rules.cooldown(rule):
+                    self.suppressed += 1
+                    continue
+                reasons.append(reason)
+                if deliver:
+                    fired[rule] = now
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO alert_state
+                    (entity_key, mode, verdict, score, sentiment, price_band, fired, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    current["mode"],
+                    current["verdict"],
+                    current["score"],
+                    current["sentiment"],
+                    current["price_band"],
+                    json.dumps(fired),
+                    now,
+                ),
+            )
+        self.evaluated += 1
+        if reasons and deliver:
+            self.fired += 1
+        return reasons
+
+    def stats(self) -> Dict[str, Any]:
+        return {"evaluated": self.evaluated, "fired": self.fired, "suppressed": self.suppressed}
@@ -28,6 +28,16 @@
     return body;
   }
 
+  async function apiConditional(path, etag) {
+    const headers = etag ? { "If-None-Match": etag } : {};
+    const res = await fetch(`${getApiBase()}${path}`, { headers });
+    if (res.status === 304) return { notModified: true, etag };
+    if (res.status === 404) return { body: null, etag: null };
+    const body = await res.json();
+    if (!res.ok) throw new Error(body && body.error ? body.error : `${res.status}`);
+    return { body, etag: res.headers.get("ETag") };
+  }
+
   function scoreClass(score) {
     if (score >= 76) return "score-good";
     if (score >= 56) return "score-mid";
@@ -82,7 +92,7 @@
         parameters: { type: "object", properties: { entity: { type: "string" } }, required: ["entity"] },
         execute: async ({ entity }) => {
           if (getStoredMode() === "simulation") return { score: 74, market_cap: 9300000000, source: "webmcp-sim" };
-          const r = await api(`/api/analyze?entity=${encodeURIComponent(entity)}&demo_mode=false`);
+          const r = await api(`/api/financials?entity=${encodeURIComponent(entity)}&demo_mode=false`);
           return r.financials || {};
         },
       });
@@ -92,7 +102,7 @@
         parameters: { type: "object", properties: { entity: { type: "string" } }, required: ["entity"] },
         execute: async ({ entity }) => {
           if (getStoredMode() === "simulation") return { reliability: 82, score: 82, source: "webmcp-sim" };
-          const r = await api(`/api/analyze?entity=${encodeURIComponent(entity)}&demo_mode=false`);
+          const r = await api(`/api/founders?entity=${encodeURIComponent(entity)}&demo_mode=false`);
           return r.founders || {};
         },
       });
@@ -102,7 +112,7 @@
         parameters: { type: "object", properties: { entity: { type: "string" } }, required: ["entity"] },
         execute: async ({ entity }) => {
           if (getStoredMode() === "simulation") return { sentiment: "NEUTRAL", score: 61, source: "webmcp-sim" };
-          const r = await api(`/api/analyze?entity=${encodeURIComponent(entity)}&demo_mode=false`);
+          const r = await api(`/api/social?entity=${encodeURIComponent(entity)}&demo_mode=false`);
           return r.social || {};
         },
       });
@@ -113,9 +123,37 @@
   }
 
   async function runAnalyze(entity) {
-    const settings = await api("/api/settings").catch(() => ({ demo_mode: false }));
-    const demoMode = !!settings.demo_mode;
-    return api(`/api/analyze?entity=${encodeURIComponent(entity)}&demo_mode=${demoMode ? "true" : "false"}`);
+    // demo_mode is resolved server-side from the saved settings.
+    return api(`/api/analyze?entity=${encodeURIComponent(entity)}`);
+  }
+
+  function runAnalyzeStream(entity, onPart) {
+    if (typeof window.EventSource !== "function") return runAnalyze(entity);
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${getApiBase()}/api/analyze/stream?entity=${encodeURIComponent(entity)}`);
+      let settled = false;
+      ["financials", "founders", "social"].forEach((name) => {
+        source.addEventListener(name, (e) => {
+          if (onPart) onPart(name, JSON.parse(e.data));
+        });
+      });
+      source.addEventListener("result", (e) => {
+        settled = true;
+        source.close();
+        resolve(JSON.parse(e.data));
+      });
+      source.addEventListener("error", (e) => {
+        source.close();
+        if (settled) return;
+        settled = true;
+        if (e.data) {
+          reject(new Error(JSON.parse(e.data).error || "stream error"));
+          return;
+        }
+        // Connection-level failure (proxy without streaming, etc.): fall back to the plain endpoint.
+        runAnalyze(entity).then(resolve, reject);
+      });
+    });
   }
 
   async function initSearch() {
@@ -150,10 +188,11 @@
             social: s,
           });
         } else {
-          const result = await runAnalyze(entity);
-          addLog("Financial analysis done.");
-          addLog("Founder analysis done.");
-          addLog("Social sentiment done.");
+          const labels = { financials: "Financial analysis", founders: "Founder analysis", social: "Social sentiment" };
+          const result = await runAnalyzeStream(entity, (name, part) => {
+            addLog(`${labels[name]} done.`);
+            renderPart(entity, name, part);
+          });
           addLog(`Verdict: ${result.verdict} (${result.score})`, result.score >= 76 ? "#00ff88" : "#ffcc00");
           renderVerdict(result);
         }
@@ -164,6 +203,14 @@
       }
     }
 
+    function renderPart(entity, name, part) {
+      verdictBox.classList.remove("hidden");
+      document.getElementById("v-entity").textContent = entity;
+      if (name === "financials") document.getElementById("m-fin").textContent = `${part.score ?? "-"} / 100`;
+      if (name === "founders") document.getElementById("m-fnd").textContent = `${part.score ?? part.reliability ?? "-"} / 100`;
+      if (name === "social") document.getElementById("m-soc").textContent = `${part.score ?? "-"} / 100`;
+    }
+
     function renderVerdict(result) {
       verdictBox.classList.remove("hidden");
       document.getElementById("v-entity").textContent = result.entity || "-";
@@ -200,12 +247,18 @@
   async function initDashboard() {
     const grid = document.getElementById("portfolio-grid");
     const status = document.getElementById("dashboard-status");
+    let etag = null;
 
     async function refresh() {
       status.textContent = "Mise à jour...";
       try {
-        const data = await api("/api/portfolio");
-        const items = data.items || [];
+        const res = await apiConditional("/api/portfolio?fields=entity,timestamp,score,verdict", etag);
+        if (res.notModified) {
+          status.textContent = `Aucun changement (${new Date().toLocaleTimeString()})`;
+          return;
+        }
+        etag = res.etag;
+        const items = res.body?.items || [];
         grid.innerHTML = "";
         if (!items.length) {
           grid.innerHTML = '<p class="hint">Aucune entité analysée pour le moment.</p>';
@@ -235,7 +288,7 @@
     setInterval(refresh, 60000);
   }
 
-  function drawSentimentChart(score) {
+  function drawSentimentChart(history) {
     const canvas = document.getElementById("sentiment-chart");
     if (!canvas) return;
     const ctx = canvas.getContext("2d");
@@ -246,13 +299,6 @@
     ctx.fillStyle = "#03110a";
     ctx.fillRect(0, 0, w, h);
 
-    const points = 24;
-    const values = Array.from({ length: points }, (_, i) => {
-      const drift = (Math.sin(i / 2.8) + 1) * 12;
-      const noise = ((i * 17) % 13) - 6;
-      return Math.max(8, Math.min(98, score + drift + noise - 15));
-    });
-
     ctx.strokeStyle = "rgba(0,255,136,0.2)";
     ctx.lineWidth = 1;
     for (let y = 20; y <= h - 20; y += 30) {
@@ -262,16 +308,36 @@
       ctx.stroke();
     }
 
-    ctx.strokeStyle = "#00ff88";
-    ctx.lineWidth = 2;
-    ctx.beginPath();
-    values.forEach((v, i) => {
-      const x = (i / (points - 1)) * (w - 20) + 10;
-      const y = h - ((v / 100) * (h - 20) + 10);
-      if (i === 0) ctx.moveTo(x, y);
-      else ctx.lineTo(x, y);
-    });
-    ctx.stroke();
+    const series = history?.series || {};
+    const ts = series.ts || [];
+    if (ts.length < 2) {
+      ctx.fillStyle = "rgba(0,255,136,0.6)";
+      ctx.font = "12px monospace";
+      ctx.fillText("Historique insuffisant — relance l'analyse plus tard.", 12, h / 2);
+      return;
+    }
+    const t0 = ts[0];
+    const span = Math.max(1, ts[ts.length - 1] - t0);
+
+    function line(values, color, width) {
+      ctx.strokeStyle = color;
+      ctx.lineWidth = width;
+      ctx.beginPath();
+      let started = false;
+      values.forEach((v, i) => {
+        if (v === null || v === undefined) return;
+        const x = ((ts[i] - t0) / span) * (w - 20) + 10;
+        const y = h - ((Math.max(0, Math.min(100, v)) / 100) * (h - 20) + 10);
+        if (!started) ctx.moveTo(x, y);
+        else ctx.lineTo(x, y);
+        started = true;
+      });
+      ctx.stroke();
+    }
+
+    line((series.bullish_ratio || []).map((v) => (v === null ? null : v * 100)), "rgba(255,196,0,0.55)", 1);
+    line(series.social || [], "rgba(0,255,136,0.45)", 1);
+    line(series.social_rolling || [], "#00ff88", 2);
   }
 
   async function initReport() {
@@ -288,39 +354,63 @@
       }
       title.innerHTML = `Rapport <span>${entity}</span>`;
       let item = null;
-      const portfolio = await api("/api/portfolio").catch(() => ({ items: [] }));
-      item = (portfolio.items || []).find((x) => String(x.entity || "").toLowerCase() === entity.toLowerCase());
-      if (!item) item = await runAnalyze(entity);
+      try {
+        item = (await apiConditional(`/api/results/${encodeURIComponent(entity)}`)).body;
+      } catch (_) {
+        item = null;
+      }
+      if (!item) item = await runAnalyzeStream(entity, renderPart);
       renderReport(item);
     }
 
+    function renderFinancials(f) {
+      document.getElementById("rf-score").textContent = `${f?.score ?? "-"} / 100`;
+      document.getElementById("rf-market-cap").textContent = fmtMoney(f?.market_cap);
+      document.getElementById("rf-revenue").textContent = fmtMoney(f?.revenue_estimate);
+      document.getElementById("rf-burn").textContent = fmtMoney(f?.burn_rate);
+      document.getElementById("rf-7d").textContent = `${Number(f?.price_change_7d || 0).toFixed(2)}%`;
+    }
+
+    function renderFounders(fd) {
+      document.getElementById("rfd-name").textContent = fd?.name || "-";
+      document.getElementById("rfd-reliability").textContent = `${fd?.reliability ?? "-"}%`;
+      document.getElementById("rfd-exits").textContent = `${fd?.past_exits ?? "-"}`;
+      document.getElementById("rfd-flags").textContent = fd?.red_flags || "-";
+    }
+
+    function renderSocial(s) {
+      document.getElementById("rs-label").textContent = s?.sentiment || "-";
+      document.getElementById("rs-intensity").textContent = `${s?.intensity ?? "-"} / 100`;
+      document.getElementById("rs-ratio").textContent = `${Math.round((s?.bullish_ratio || 0) * 100)}%`;
+      document.getElementById("rs-top-post").textContent = s?.top_post || "-";
+    }
+
+    async function loadHistory() {
+      if (!entity) return;
+      const res = await apiConditional(`/api/history/${encodeURIComponent(entity)}?days=90&points=120`).catch(() => null);
+      drawSentimentChart(res?.body || null);
+    }
+
+    function renderPart(name, part) {
+      if (name === "financials") renderFinancials(part);
+      if (name === "founders") renderFounders(part);
+      if (name === "social") renderSocial(part);
+    }
+
     function renderReport(r) {
-      document.getElementById("rf-score").textContent = `${r.financials?.score ?? "-"} / 100`;
-      document.getElementById("rf-market-cap").textContent = fmtMoney(r.financials?.market_cap);
-      document.getElementById("rf-revenue").textContent = fmtMoney(r.financials?.revenue_estimate);
-      document.getElementById("rf-burn").textContent = fmtMoney(r.financials?.burn_rate);
-      document.getElementById("rf-7d").textContent = `${Number(r.financials?.price_change_7d || 0).toFixed(2)}%`;
-
-      document.getElementById("rfd-name").textContent = r.founders?.name || "-";
-      document.getElementById("rfd-reliability").textContent = `${r.founders?.reliability ?? "-"}%`;
-      document.getElementById("rfd-exits").textContent = `${r.founders?.past_exits ?? "-"}`;
-      document.getElementById("rfd-flags").textContent = r.founders?.red_flags || "-";
-
-      document.getElementById("rs-label").textContent = r.social?.sentiment || "-";
-      document.getElementById("rs-intensity").textContent = `${r.social?.intensity ?? "-"} / 100`;
-      document.getElementById("rs-ratio").textContent = `${Math.round((r.social?.bullish_ratio || 0) * 100)}%`;
-      document.getElementById("rs-top-post").textContent = r.social?.top_post || "-";
+      renderFinancials(r.financials);
+      renderFounders(r.founders);
+      renderSocial(r.social);
 
       document.getElementById("rv-score").textContent = `${r.score ?? "--"}%`;
       document.getElementById("rv-verdict").textContent = r.verdict || "-";
       document.getElementById("rv-reason").textContent = r.reason || "-";
-
-      drawSentimentChart(Number(r.social?.score || 50));
+      loadHistory();
     }
 
     runBtn?.addEventListener("click", async () => {
       if (!entity) return;
-      const r = await runAnalyze(entity);
+      const r = await runAnalyzeStream(entity, renderPart);
       renderReport(r);
     });
     exportBtn?.addEventListener("click", () => window.print());
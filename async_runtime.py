@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency
+    HTTP2_AVAILABLE = False
+
+
+IO_THREADS = int(os.getenv("INVESTAI_IO_THREADS", "32"))
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=90.0)
+HTTP_TIMEOUT = httpx.Timeout(12.0, connect=5.0)
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_pid: Optional[int] = None
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread, _pid
+    # gunicorn forks after import, so a loop inherited from the parent is never reused.
+    if _loop is not None and _pid == os.getpid():
+        return _loop
+    with _lock:
+        if _loop is None or _pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="investai-io"))
+            thread = threading.Thread(target=_run_loop, args=(loop,), name="investai-loop", daemon=True)
+            thread.start()
+            _loop, _thread, _pid = loop, thread, os.getpid()
+    return _loop
+
+
+def in_loop_thread() -> bool:
+    return _thread is not None and threading.current_thread() is _thread and _pid == os.getpid()
+
+
+def run_sync(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    if in_loop_thread():
+        raise RuntimeError("run_sync() cannot block the shared event loop thread; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def submit(coro: Awaitable[Any]):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def http_client() -> httpx.AsyncClient:
+    # Pooled per event loop: the shared loop gets one long-lived client, ad-hoc loops their own.
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+def _shutdown() -> None:
+    if _loop is None or _pid != os.getpid() or not _loop.is_running():
+        return
+    client = _clients.get(_loop)
+    if client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), _loop).result(2)
+        except Exception:
+            pass
+    _loop.call_soon_threadsafe(_loop.stop)
+
+
+atexit.register(_shutdown)
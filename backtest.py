@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_store import SERIES_COLUMNS, ResultStore
+from runtime_config import DATA_DIR
+
+
+MODEL_FILE = DATA_DIR / "verdict_model.json"
+DAY = 86400.0
+COMPONENTS = ("financials", "founders", "social")
+SCORE_BINS = 101
+BUCKETS = ("INVESTIR", "OBSERVER", "FUIR")
+
+
+def load_panel(
+    store: ResultStore,
+    entities: Optional[Sequence[str]] = None,
+    days: float = 365.0,
+    include_demo: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    # Returns components (entities x days x 3) and price (entities x days) on a daily grid.
+    if entities is None:
+        entities = [r[0] for r in store.conn.execute("SELECT DISTINCT entity_key FROM series").fetchall()]
+    since = time.time() - days * DAY
+    rows = store.series(entities, since, include_demo=include_demo)
+    if not rows:
+        return np.empty((0, 0, len(COMPONENTS))), np.empty((0, 0)), []
+    keys = np.array([r[0] for r in rows])
+    data = np.array([r[1:] for r in rows], dtype=float)
+    names, ent_idx = np.unique(keys, return_inverse=True)
+    day_idx = ((data[:, 0] - since) // DAY).astype(int)
+    n_days = int(day_idx.max()) + 1
+    cols = [1 + SERIES_COLUMNS.index(c) for c in COMPONENTS]
+    comps = np.full((len(names), n_days, len(COMPONENTS)), np.nan)
+    price = np.full((len(names), n_days), np.nan)
+    # Rows are time-ordered, so the last snapshot of each day wins.
+    comps[ent_idx, day_idx] = data[:, cols]
+    price[ent_idx, day_idx] = data[:, 1 + SERIES_COLUMNS.index("price")]
+    return comps, price, [str(n) for n in names]
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(values.shape[1])[None, :], 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = values[np.arange(values.shape[0])[:, None], idx]
+    filled[np.cumsum(valid, axis=1) == 0] = np.nan
+    return filled
+
+
+def samples(comps: np.ndarray, price: np.ndarray, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    if comps.size == 0 or price.shape[1] <= horizon:
+        return np.empty((0, len(COMPONENTS))), np.empty(0)
+    filled = forward_fill(price)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = filled[:, horizon:] / filled[:, :-horizon] - 1.0
+    x = comps[:, :-horizon]
+    # Only days with a real snapshot count; the exit price may be carried forward.
+    mask = ~np.isnan(x).any(axis=2) & ~np.isnan(price[:, :-horizon]) & np.isfinite(ret)
+    return x[mask], ret[mask]
+
+
+def weight_grid(step: float = 0.05, floor: float = 0.0) -> np.ndarray:
+    n = int(round(1.0 / step))
+    out = [
+        (a * step, b * step, (n - a - b) * step)
+        for a in range(n + 1)
+        for b in range(n + 1 - a)
+        if min(a, b, n - a - b) * step >= floor - 1e-9
+    ]
+    return np.array(out, dtype=float)
+
+
+def threshold_grid(
+    observe: Sequence[int] = range(40, 71, 2),
+    invest: Sequence[int] = range(56, 91, 2),
+) -> np.ndarray:
+    return np.array([(hi, lo) for lo, hi in itertools.product(observe, invest) if hi > lo], dtype=int)
+
+
+def _bin_stats(x: np.ndarray, ret: np.ndarray, weights: np.ndarray, chunk: int = 64) -> Tuple[np.ndarray, ...]:
+    # Per weight vector: sample count, return sum and positive-return count for every integer score 0..100.
+    k = len(weights)
+    counts = np.zeros((k, SCORE_BINS))
+    sums = np.zeros((k, SCORE_BINS))
+    wins = np.zeros((k, SCORE_BINS))
+    up = (ret > 0).astype(float)
+    for start in range(0, k, chunk):
+        w = weights[start : start + chunk]
+        scores = np.clip(np.rint(x @ w.T), 0, SCORE_BINS - 1).astype(np.int64)
+        flat = (scores + SCORE_BINS * np.arange(len(w))[None, :]).ravel()
+        size = SCORE_BINS * len(w)
+        shape = (len(w), SCORE_BINS)
+        counts[start : start + len(w)] = np.bincount(flat, minlength=size).reshape(shape)
+        sums[start : start + len(w)] = np.bincount(flat, weights=np.repeat(ret, len(w)), minlength=size).reshape(shape)
+        wins[start : start + len(w)] = np.bincount(flat, weights=np.repeat(up, len(w)), minlength=size).reshape(shape)
+    return counts, sums, wins
+
+
+def _buckets(table: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Prefix sums turn every (invest, observe) cut-off pair into two lookups: (weights x thresholds) per bucket.
+    prefix = np.concatenate([np.zeros((table.shape[0], 1)), np.cumsum(table, axis=1)], axis=1)
+    total = prefix[:, -1:]
+    hi, lo = thresholds[:, 0], thresholds[:, 1]
+    fuir = prefix[:, lo]
+    invest = total - prefix[:, hi]
+    return invest, total - invest - fuir, fuir
+
+
+def evaluate(
+    x: np.ndarray,
+    ret: np.ndarray,
+    weights: np.ndarray,
+    thresholds: np.ndarray,
+    min_support: float = 0.05,
+) -> Dict[str, np.ndarray]:
+    counts, sums, wins = _bin_stats(x, ret, weights)
+    n = {b: v for b, v in zip(BUCKETS, _buckets(counts, thresholds))}
+    s = {b: v for b, v in zip(BUCKETS, _buckets(sums, thresholds))}
+    w = {b: v for b, v in zip(BUCKETS, _buckets(wins, thresholds))}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = {b: s[b] / n[b] for b in BUCKETS}
+        hit = {"INVESTIR": w["INVESTIR"] / n["INVESTIR"], "OBSERVER": w["OBSERVER"] / n["OBSERVER"]}
+        hit["FUIR"] = 1.0 - w["FUIR"] / n["FUIR"]
+    support = max(1.0, min_support * len(ret))
+    spread = mean["INVESTIR"] - mean["FUIR"]
+    objective = np.where((n["INVESTIR"] >= support) & (n["FUIR"] >= support), spread, -np.inf)
+    ic = _information_coefficient(counts, sums, ret)
+    return {"objective": objective, "ic": ic, "count": n, "mean": mean, "hit": hit}
+
+
+def _information_coefficient(counts: np.ndarray, sums: np.ndarray, ret: np.ndarray) -> np.ndarray:
+    # Correlation of score and forward return per weight vector, straight from the bin stats. It uses every
+    # sample, where the bucket spread only sees the tails, so it is what ranks the weight vectors.
+    bins = np.arange(SCORE_BINS, dtype=float)
+    n = counts.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_score = counts @ bins / n
+        cov = sums @ bins / n - mean_score * ret.mean()
+        var = counts @ (bins * bins) / n - mean_score * mean_score
+        return cov / np.sqrt(var * ret.var())
+
+
+def _config(result: Dict[str, Any], weights: np.ndarray, thresholds: np.ndarray, i: int, j: int) -> Dict[str, Any]:
+    def num(v: float) -> Optional[float]:
+        return round(float(v), 6) if np.isfinite(v) else None
+
+    return {
+        "weights": {c: round(float(v), 4) for c, v in zip(COMPONENTS, weights[i])},
+        "thresholds": {"invest": int(thresholds[j, 0]), "observe": int(thresholds[j, 1])},
+        "objective": num(result["objective"][i, j]),
+        "ic": num(result["ic"][i]),
+        "buckets": {
+            b: {
+                "count": int(result["count"][b][i, j]),
+                "mean_return": num(result["mean"][b][i, j]),
+                "hit_rate": num(result["hit"][b][i, j]),
+            }
+            for b in BUCKETS
+        },
+    }
+
+
+def run_backtest(
+    store: ResultStore,
+    horizon_days: int = 7,
+    days: float = 365.0,
+    step: float = 0.05,
+    thresholds: Optional[np.ndarray] = None,
+    top: int = 10,
+    panel: Optional[Tuple[np.ndarray, np.ndarray, List[str]]] = None,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    comps, price, names = panel if panel is not None else load_panel(store, days=days)
+    x, ret = samples(comps, price, horizon_days)
+    weights = weight_grid(step)
+    thresholds = threshold_grid() if thresholds is None else thresholds
+    report: Dict[str, Any] = {
+        "horizon_days": horizon_days,
+        "entities": len(names),
+        "days": int(price.shape[1]) if price.ndim == 2 else 0,
+        "samples": int(len(ret)),
+        "configurations": int(len(weights) * len(thresholds)),
+        "best": None,
+        "top": [],
+    }
+    if len(ret):
+        result = evaluate(x, ret, weights, thresholds)
+        # Weight vectors rank by information coefficient; each gets the cut-offs with the widest spread.
+        objective = result["objective"]
+        cutoff = np.argmax(np.where(np.isfinite(objective), objective, -1e18), axis=1)
+        order = np.argsort(-np.where(np.isfinite(result["ic"]), result["ic"], -1e18))[:top]
+        ranked = [(i, cutoff[i]) for i in order if np.isfinite(result["ic"][i] + objective[i, cutoff[i]])]
+        report["top"] = [_config(result, weights, thresholds, int(i), int(j)) for i, j in ranked]
+        report["best"] = report["top"][0] if report["top"] else None
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def save_model(report: Dict[str, Any], path: Path = MODEL_FILE) -> Optional[Dict[str, Any]]:
+    best = report.get("best")
+    if not best:
+        return None
+    model = {
+        "weights": best["weights"],
+        "thresholds": best["thresholds"],
+        "horizon_days": report["horizon_days"],
+        "samples": report["samples"],
+        "objective": best["objective"],
+        "ic": best["ic"],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(model, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return model
+
+
+def synthetic_panel(entities: int = 500, days: int = 365, seed: int = 7) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    rng = np.random.default_rng(seed)
+    comps = rng.uniform(20, 95, size=(entities, days, len(COMPONENTS)))
+    # Tomorrow's drift follows today's components, so the grid has a known optimum to find.
+    signal = (comps @ np.array([0.5, 0.2, 0.3]) - 60.0) / 1000.0
+    drift = np.concatenate([np.zeros((entities, 1)), signal[:, :-1]], axis=1)
+    price = 100.0 * np.exp(np.cumsum(drift + rng.normal(0, 0.02, size=(entities, days)), axis=1))
+    return comps, price, [f"synthetic-{i}" for i in range(entities)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest verdict weights and thresholds on stored history.")
+    parser.add_argument("--db", default=str(DATA_DIR / "investai.db"))
+    parser.add_argument("--horizon", type=int, default=7, help="forward return horizon in days")
+    parser.add_argument("--days", type=float, default=365.0)
+    parser.add_argument("--step", type=float, default=0.05, help="weight grid step")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--save", action="store_true", help=f"write the best configuration to {MODEL_FILE.name}")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N", help="benchmark on N synthetic entities")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(Path(args.db))
+    panel = synthetic_panel(args.synthetic, int(args.days)) if args.synthetic else None
+    report = run_backtest(store, args.horizon, args.days, args.step, top=args.top, panel=panel)
+    if args.save and not args.synthetic:
+        report["saved"] = save_model(report) is not None
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
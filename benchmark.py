@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+
+APP_DIR = Path(__file__).resolve().parent
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 40.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    coins: int = 500
+    seed: int = 1
+
+
+class StubProviders:
+    # One local HTTP server standing in for CoinGecko, Reddit and Telegram.
+
+    def __init__(self, config: StubConfig) -> None:
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.started = time.time()
+        self.coins = [
+            {"id": f"stubcoin-{i}", "symbol": f"sc{i}", "name": f"Stubcoin {i}"} for i in range(config.coins)
+        ]
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            r = self._rng.random()
+            delay = max(0.0, self._rng.gauss(self.config.latency_ms, self.config.jitter_ms)) / 1000.0
+        return r, delay
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _market_row(self, coin_id: str, rank: int) -> Dict[str, Any]:
+        seed = sum(map(ord, coin_id))
+        return {
+            "id": coin_id,
+            "current_price": 1.0 + seed % 500,
+            "market_cap": 1e6 * (1 + seed % 9000),
+            "price_change_percentage_7d_in_currency": (seed % 40) - 15.0,
+            "market_cap_rank": rank,
+        }
+
+    def route(self, path: str, query: Dict[str, List[str]]) -> tuple:
+        if path == "/coingecko/coins/list":
+            return 200, self.coins
+        if path == "/coingecko/coins/markets":
+            ids = [i for i in (query.get("ids") or [""])[0].split(",") if i]
+            if not ids:
+                per_page = int((query.get("per_page") or ["100"])[0])
+                ids = [c["id"] for c in self.coins[:per_page]]
+            return 200, [self._market_row(i, n + 1) for n, i in enumerate(ids)]
+        if path == "/coingecko/search":
+            q = (query.get("query") or [""])[0].lower()
+            hits = [c for c in self.coins if q and (q == c["symbol"] or q in c["name"].lower())][:5]
+            return 200, {"coins": hits}
+        if path == "/reddit/search.json":
+            q = (query.get("q") or [""])[0]
+            seed = sum(map(ord, q))
+            posts = [
+                {
+                    "data": {
+                        "id": f"{seed:x}p{i}",
+                        "created_utc": self.started - i * 3600,
+                        "title": f"{q} post {i}",
+                        "score": (seed * (i + 3)) % 120,
+                    }
+                }
+                for i in range(15)
+            ]
+            # Listings are newest first; "before" keeps only the posts newer than the given fullname.
+            before = (query.get("before") or [""])[0][3:]
+            ids = [p["data"]["id"] for p in posts]
+            if before in ids:
+                posts = posts[: ids.index(before)]
+            return 200, {"data": {"children": posts}}
+        if path == "/reddit/api/info.json":
+            # Stub post ids are "<seed hex>p<index>", so a post can be rebuilt from its fullname alone.
+            posts = []
+            for fullname in (query.get("id") or [""])[0].split(","):
+                seed, _, i = fullname[3:].partition("p")
+                if seed and i.isdigit():
+                    n = int(i)
+                    score = (int(seed, 16) * (n + 3)) % 120
+                    posts.append({"data": {"id": fullname[3:], "created_utc": self.started - n * 3600, "score": score}})
+            return 200, {"data": {"children": posts}}
+        if path.startswith("/telegram/bot") and path.endswith("/sendMessage"):
+            return 200, {"ok": True, "result": {}}
+        return 404, {"error": "unknown stub route"}
+
+    def start(self) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self) -> None:
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                roll, delay = stub._draw()
+                time.sleep(delay)
+                provider = parsed.path.strip("/").split("/", 1)[0]
+                cfg = stub.config
+                if roll < cfg.rate_limit_rate:
+                    stub._count(f"{provider}:429")
+                    body = {"ok": False, "parameters": {"retry_after": cfg.retry_after}}
+                    self._reply(429, body, {"Retry-After": str(int(cfg.retry_after))})
+                    return
+                if roll < cfg.rate_limit_rate + cfg.error_rate:
+                    stub._count(f"{provider}:500")
+                    self._reply(500, {"error": "injected"})
+                    return
+                status, body = stub.route(parsed.path, parse_qs(parsed.query))
+                stub._count(f"{provider}:{status}")
+                self._reply(status, body)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, *args: Any) -> None:
+                return None
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="stub-providers", daemon=True).start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _ms(latencies: List[float], pct: float) -> Optional[float]:
+    # The app modules read the data dir at import time, so they are imported only once the benchmark set it.
+    from provider_chain import _percentile
+
+    return round(_percentile(latencies, pct) * 1000.0, 3) if latencies else None
+
+
+def _summarize(latencies: List[float], errors: int, elapsed: float, rss_before: Optional[float]) -> Dict[str, Any]:
+    from metrics import rss_mb
+
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "p50_ms": _ms(latencies, 0.50),
+        "p95_ms": _ms(latencies, 0.95),
+        "p99_ms": _ms(latencies, 0.99),
+        "max_ms": _ms(latencies, 1.0),
+        "rss_mb_before": rss_before,
+        "rss_mb_after": rss_mb(),
+    }
+
+
+def _drive(call: Callable[[int], bool], requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    from metrics import rss_mb
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(one, range(requests)))
+    return _summarize(latencies, errors, time.perf_counter() - started, rss_before)
+
+
+def _entity(i: int, pool_size: int, coins: int) -> str:
+    # Alternate between stub coins (CoinGecko path) and plain names (equity/fallback path).
+    n = i % max(1, pool_size)
+    return f"$SC{n % coins}" if n % 2 == 0 else f"Company {n}"
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline against local stub providers.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--entities", type=int, default=200, help="distinct entities cycled through")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the upstream token buckets enabled")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of stub replies that are 429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", default="run_research,analyze,portfolio")
+    parser.add_argument("--allow-yahoo", action="store_true", help="let yfinance reach the real Yahoo API")
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    stub = StubProviders(config)
+    base = stub.start()
+    data_dir = tempfile.mkdtemp(prefix="investai-bench-")
+    # Provider URLs and the data directory are read at import time, so the app is imported only now.
+    os.environ.update(
+        {
+            "INVESTAI_COINGECKO_URL": f"{base}/coingecko",
+            "INVESTAI_REDDIT_URL": f"{base}/reddit",
+            "INVESTAI_TELEGRAM_URL": f"{base}/telegram",
+            "INVESTAI_DATA_DIR": data_dir,
+        }
+    )
+    os.environ.setdefault("INVESTAI_SCHEDULER", "0")
+    os.environ.setdefault("INVESTAI_OUTBOX", "0")
+    # The stubs measure the app, not the real providers' budgets; --rate-limit keeps the production buckets.
+    os.environ.setdefault("INVESTAI_RATE_LIMIT", "1" if args.rate_limit else "0")
+
+    from providers import registry
+    from async_runtime import submit
+    from research_engine import ensure_storage, run_research
+    from server import app
+
+    if not args.allow_yahoo:
+        # yfinance owns its HTTP stack and cannot be pointed at the stub; leave it out for reproducibility.
+        registry.disable("yfinance")
+    ensure_storage()
+    settings = {"demo_mode": False}
+    scenarios: Dict[str, Any] = {}
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+
+    def name_of(i: int) -> str:
+        return _entity(i, args.entities, config.coins)
+
+    if "run_research" in selected:
+
+        def research(i: int) -> bool:
+            submit(run_research(name_of(i), settings=settings)).result(timeout=120)
+            return True
+
+        scenarios["run_research"] = _drive(research, args.requests, args.concurrency)
+
+    if {"analyze", "portfolio"} & set(selected):
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+        app_url = f"http://127.0.0.1:{server.server_port}"
+        import httpx
+
+        client = httpx.Client(base_url=app_url, timeout=120, limits=httpx.Limits(max_connections=args.concurrency * 2))
+        try:
+            if "analyze" in selected:
+                scenarios["analyze"] = _drive(
+                    lambda i: client.get("/api/analyze", params={"entity": name_of(i + args.requests)}).is_success,
+                    args.requests,
+                    args.concurrency,
+                )
+            if "portfolio" in selected:
+                scenarios["portfolio"] = _drive(
+                    lambda i: client.get("/api/portfolio").is_success, args.requests, args.concurrency
+                )
+                scenarios["portfolio_projected"] = _drive(
+                    lambda i: client.get("/api/portfolio", params={"fields": "entity,score,verdict"}).is_success,
+                    args.requests,
+                    args.concurrency,
+                )
+        finally:
+            client.close()
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created_at": time.time(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "entities": args.entities,
+            "stub": asdict(config),
+            "yahoo": "live" if args.allow_yahoo else "disabled",
+        },
+        "scenarios": scenarios,
+        "stub_requests": dict(sorted(stub.counts.items())),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+    stub.stop()
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps({k: {m: v.get(m) for m in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")} for k, v in scenarios.items()}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
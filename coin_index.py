@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_runtime import http_client
+from runtime_config import COINGECKO_API, DATA_DIR
+from singleflight import file_lock
+
+
+INDEX_FILE = DATA_DIR / "coin_index.json"
+COINGECKO_COINS_LIST = f"{COINGECKO_API}/coins/list"
+COINGECKO_TOP_MARKETS = f"{COINGECKO_API}/coins/markets"
+REFRESH_SECONDS = float(os.getenv("INVESTAI_COIN_INDEX_REFRESH", "86400"))
+RETRY_SECONDS = 300.0
+DOWNLOAD_TIMEOUT = 30.0
+TOP_COINS = 250
+
+# Names people type that are neither a coin's symbol, id nor listed name.
+ALIASES: Dict[str, str] = {
+    "bitcoin": "bitcoin",
+    "btc": "bitcoin",
+    "xbt": "bitcoin",
+    "ether": "ethereum",
+    "eth": "ethereum",
+    "sol": "solana",
+    "bnb": "binancecoin",
+    "xrp": "ripple",
+    "doge": "dogecoin",
+    "ada": "cardano",
+    "usdt": "tether",
+    "usdc": "usd-coin",
+    "matic": "matic-network",
+    "polygon": "matic-network",
+    "dot": "polkadot",
+    "avax": "avalanche-2",
+    "link": "chainlink",
+    "ton": "the-open-network",
+}
+
+_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return _WORD.sub(" ", (text or "").replace("$", "").lower()).strip()
+
+
+class CoinIndex:
+    def __init__(self, path: Path = INDEX_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, str] = {}
+        self._symbols: Dict[str, str] = {}
+        self._keys: List[str] = []
+        self._rank: Dict[str, int] = {}
+        self._built_at = 0.0
+        self._loaded_mtime: Optional[float] = None
+        self._failed_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._by_key)
+
+    def _build(self, coins: List[Dict[str, str]], top: List[str], built_at: float) -> None:
+        rank = {coin_id: i for i, coin_id in enumerate(top)}
+        by_key: Dict[str, Tuple[int, str]] = {}
+        symbols: Dict[str, Tuple[int, str]] = {}
+
+        def claim(table: Dict[str, Tuple[int, str]], key: str, coin_id: str) -> None:
+            # Several coins share a symbol or name; the larger market cap wins, then the shorter id.
+            if not key:
+                return
+            order = (rank.get(coin_id, TOP_COINS + len(coin_id)), coin_id)
+            if key not in table or order < table[key]:
+                table[key] = order
+
+        for coin in coins:
+            coin_id = str(coin.get("id") or "")
+            if not coin_id:
+                continue
+            claim(by_key, normalize(coin_id.replace("-", " ")), coin_id)
+            claim(by_key, normalize(str(coin.get("name") or "")), coin_id)
+            claim(symbols, normalize(str(coin.get("symbol") or "")), coin_id)
+        resolved = {k: v[1] for k, v in by_key.items()}
+        resolved.update({k: v for k, v in ALIASES.items()})
+        with self._lock:
+            self._by_key = resolved
+            self._symbols = {k: v[1] for k, v in symbols.items()}
+            self._keys = sorted(set(resolved) | set(self._symbols))
+            self._rank = rank
+            self._built_at = built_at
+
+    def load(self) -> bool:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return True
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._build(data.get("coins") or [], data.get("top") or [], float(data.get("built_at") or 0.0))
+        except Exception:
+            return False
+        self._loaded_mtime = mtime
+        return True
+
+    def age(self) -> float:
+        return time.time() - self._built_at if self._built_at else float("inf")
+
+    async def _download(self) -> Dict[str, Any]:
+        client = http_client()
+        res = await client.get(COINGECKO_COINS_LIST, timeout=DOWNLOAD_TIMEOUT)
+        res.raise_for_status()
+        coins = [
+            {"id": c.get("id"), "symbol": c.get("symbol"), "name": c.get("name")}
+            for c in res.json() or []
+            if c.get("id")
+        ]
+        top: List[str] = []
+        try:
+            mr = await client.get(
+                COINGECKO_TOP_MARKETS,
+                params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": TOP_COINS, "page": 1},
+                timeout=DOWNLOAD_TIMEOUT,
+            )
+            mr.raise_for_status()
+            top = [str(row.get("id")) for row in mr.json() or [] if row.get("id")]
+        except Exception:
+            pass
+        return {"built_at": time.time(), "coins": coins, "top": top}
+
+    async def refresh(self, force: bool = False) -> bool:
+        async with file_lock(self.path.with_suffix(".lock"), timeout=DOWNLOAD_TIMEOUT * 2):
+            # Another worker may have refreshed the file while we waited for the lock.
+            self.load()
+            if not force and self.age() < REFRESH_SECONDS:
+                return True
+            try:
+                data = await self._download()
+            except Exception:
+                self._failed_at = time.time()
+                return self.ready
+            if not data["coins"]:
+                self._failed_at = time.time()
+                return self.ready
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self.load()
+            return True
+
+    async def ensure(self, wait: float = 5.0) -> bool:
+        self.load()
+        if self.age() < REFRESH_SECONDS or time.time() - self._failed_at < RETRY_SECONDS:
+            return self.ready
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.get_running_loop().create_task(self.refresh())
+            self._refreshing.add_done_callback(lambda t: t.cancelled() or t.exception())
+        if self.ready:
+            # Serve the previous index while the new list downloads.
+            return True
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._refreshing), wait)
+        except Exception:
+            return False
+
+    def resolve(self, entity: str) -> Optional[str]:
+        key = normalize(entity)
+        if not key:
+            return None
+        return self._by_key.get(key) or self._symbols.get(key)
+
+    def route(self, entity: str) -> str:
+        raw = (entity or "").strip()
+        key = normalize(raw)
+        coin_id = self._by_key.get(key) or self._symbols.get(key) if key else None
+        if not coin_id:
+            return "equity"
+        if raw.startswith("$") or key in ALIASES or coin_id in self._rank:
+            return "crypto"
+        # Long-tail coins reuse stock tickers and company names, so the equity gets the first try.
+        return "both"
+
+    def prefix(self, text: str, limit: int = 10) -> List[Dict[str, str]]:
+        key = normalize(text)
+        if not key:
+            return []
+        keys = self._keys
+        out: List[Dict[str, str]] = []
+        seen = set()
+        i = bisect.bisect_left(keys, key)
+        while i < len(keys) and keys[i].startswith(key) and len(out) < limit:
+            coin_id = self._by_key.get(keys[i]) or self._symbols.get(keys[i])
+            if coin_id and coin_id not in seen:
+                seen.add(coin_id)
+                out.append({"match": keys[i], "id": coin_id})
+            i += 1
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "keys": len(self._keys),
+            "age": None if not self._built_at else round(self.age(), 1),
+        }
+
+
+coin_index = CoinIndex()
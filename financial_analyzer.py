@@ -1,19 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import hashlib
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from async_runtime import http_client, run_sync
+from coin_index import coin_index
+from fixtures import fixture, replaying
+from provider_cache import cache_key, cached_call, cached_call_async, get_cache
+from provider_chain import ProviderFailed, guarded_call, provider_step, run_chain, throttled
+from providers import registry
+from rate_limiter import Throttled, rate_limiter
+from runtime_config import COINGECKO_API
 
-try:
-    import yfinance as yf
-except Exception:  # pragma: no cover - optional dependency
-    yf = None
 
-
-COINGECKO_SEARCH = "https://api.coingecko.com/api/v3/search"
-COINGECKO_MARKETS = "https://api.coingecko.com/api/v3/coins/markets"
+COINGECKO_SEARCH = f"{COINGECKO_API}/search"
+COINGECKO_MARKETS = f"{COINGECKO_API}/coins/markets"
+COINGECKO_MARKETS_PAGE = 250
+# Fundamentals have no bulk endpoint; this many per-ticker info calls run at once (the yahoo bucket still applies).
+YAHOO_INFO_CONCURRENCY = 8
 
 
 @dataclass
@@ -25,6 +33,8 @@ class FinancialSnapshot:
     revenue_estimate: float
     burn_rate: float
     source: str
+    cache: Dict[str, Any] = field(default_factory=dict)
+    degraded: Optional[str] = None
 
     def as_dict(self) -> Dict[str, Any]:
         return {
@@ -35,6 +45,8 @@ class FinancialSnapshot:
             "revenue_estimate": self.revenue_estimate,
             "burn_rate": self.burn_rate,
             "source": self.source,
+            "cache": self.cache,
+            "degraded": self.degraded,
         }
 
 
@@ -44,118 +56,190 @@ def _hash_score(seed: str, low: int = 45, high: int = 82) -> int:
     return low + (value % max(1, (high - low + 1)))
 
 
-def _is_probable_crypto(entity: str) -> bool:
+def _route(entity: str) -> str:
+    if coin_index.ready:
+        return coin_index.route(entity)
+    # Until the coin list has been downloaded once, fall back to the substring heuristic.
     s = (entity or "").strip().lower()
-    return s.startswith("$") or any(k in s for k in ("btc", "eth", "sol", "coin", "token", "crypto"))
+    crypto = s.startswith("$") or any(k in s for k in ("btc", "eth", "sol", "coin", "token", "crypto"))
+    return "crypto" if crypto else "equity"
 
 
-def _coingecko_lookup(entity: str, timeout: int = 12) -> Optional[dict]:
+async def _coin_id(entity: str, timeout: float = 12) -> Optional[str]:
+    if coin_index.ready:
+        return coin_index.resolve(entity)
     query = entity.replace("$", "").strip()
-    if not query:
+    return await _coingecko_search_id(query, timeout) if query else None
+
+
+async def _coingecko_search_id(query: str, timeout: float = 12) -> Optional[str]:
+    res = await http_client().get(COINGECKO_SEARCH, params={"query": query}, timeout=timeout)
+    res.raise_for_status()
+    coins = res.json().get("coins", [])
+    if not coins:
         return None
-    try:
-        res = requests.get(COINGECKO_SEARCH, params={"query": query}, timeout=timeout)
-        res.raise_for_status()
-        coins = res.json().get("coins", [])
-        if not coins:
-            return None
-        coin_id = coins[0]["id"]
-        mr = requests.get(
+    return coins[0]["id"]
+
+
+async def _coingecko_markets(coin_ids: List[str], timeout: float = 12) -> Dict[str, dict]:
+    chunks = [coin_ids[i : i + COINGECKO_MARKETS_PAGE] for i in range(0, len(coin_ids), COINGECKO_MARKETS_PAGE)]
+
+    async def fetch(chunk: List[str]) -> List[dict]:
+        mr = await http_client().get(
             COINGECKO_MARKETS,
-            params={"vs_currency": "usd", "ids": coin_id, "price_change_percentage": "7d"},
+            params={
+                "vs_currency": "usd",
+                "ids": ",".join(chunk),
+                "price_change_percentage": "7d",
+                "per_page": len(chunk),
+            },
             timeout=timeout,
         )
         mr.raise_for_status()
-        rows = mr.json() or []
-        if not rows:
-            return None
-        return rows[0]
-    except Exception:
+        return mr.json() or []
+
+    rows: Dict[str, dict] = {}
+    for page in await asyncio.gather(*(fetch(c) for c in chunks)):
+        for row in page:
+            rows[str(row.get("id"))] = row
+    return rows
+
+
+@fixture("coingecko")
+async def _coingecko_lookup(entity: str, timeout: float = 12) -> Optional[dict]:
+    coin_id = await _coin_id(entity, timeout)
+    if not coin_id:
         return None
+    return (await _coingecko_markets([coin_id], timeout)).get(coin_id)
+
 
+def _yahoo_ticker(entity: str) -> str:
+    return (entity or "").strip().upper().replace("$", "")
 
+
+def _pct_change(first: float, last: float) -> float:
+    return ((last - first) / first) * 100.0 if first else 0.0
+
+
+@fixture("yfinance")
 def _yahoo_lookup(entity: str) -> Optional[dict]:
+    # Raises on upstream errors: only ever called through provider_step, whose guarded_call turns them into
+    # breaker failures. The batch path uses _yahoo_info, which keeps its own guard.
+    yf = registry.get("yfinance")
     if yf is None:
         return None
-    ticker = (entity or "").strip().upper().replace("$", "")
+    ticker = _yahoo_ticker(entity)
     if not ticker:
         return None
+    tk = yf.Ticker(ticker)
+    info = tk.info or {}
+    hist = tk.history(period="7d")
+    pct = 0.0
+    if not hist.empty and "Close" in hist:
+        pct = _pct_change(float(hist["Close"].iloc[0]), float(hist["Close"].iloc[-1]))
+    market_cap = float(info.get("marketCap") or 0.0)
+    price = float(info.get("currentPrice") or info.get("regularMarketPrice") or 0.0)
+    if not market_cap and not price:
+        # Unknown tickers come back as an empty info dict; None lets the chain try the next provider.
+        return None
+    return {
+        "market_cap": market_cap,
+        "current_price": price,
+        "price_change_7d": pct,
+        "revenue": float(info.get("totalRevenue") or 0.0),
+    }
+
+
+def _yahoo_info(ticker: str) -> Optional[dict]:
+    yf = registry.get("yfinance")
+    if yf is None:
+        return None
+    rate_limiter.acquire_sync("yfinance-info")
     try:
-        tk = yf.Ticker(ticker)
-        info = tk.info or {}
-        hist = tk.history(period="7d")
-        pct = 0.0
-        if not hist.empty and "Close" in hist:
-            first = float(hist["Close"].iloc[0])
-            last = float(hist["Close"].iloc[-1])
-            if first:
-                pct = ((last - first) / first) * 100.0
+        info = yf.Ticker(ticker).info or {}
         return {
             "market_cap": float(info.get("marketCap") or 0.0),
-            "current_price": float(info.get("currentPrice") or info.get("regularMarketPrice") or 0.0),
-            "price_change_7d": pct,
             "revenue": float(info.get("totalRevenue") or 0.0),
         }
     except Exception:
         return None
 
 
-def analyze_financials(entity: str, demo_mode: bool = False) -> Dict[str, Any]:
-    if not entity:
-        raise ValueError("entity is required")
+def _yahoo_bulk_history(tickers: List[str]) -> Dict[str, Tuple[float, float]]:
+    yf = registry.get("yfinance") if tickers else None
+    if yf is None:
+        return {}
+    rate_limiter.acquire_sync("yfinance")
+    try:
+        frame = yf.download(tickers, period="7d", group_by="ticker", progress=False, threads=True)
+    except Exception:
+        return {}
+    out: Dict[str, Tuple[float, float]] = {}
+    for ticker in tickers:
+        try:
+            closes = (frame[ticker] if len(tickers) > 1 else frame)["Close"].dropna()
+        except Exception:
+            continue
+        if closes.empty:
+            continue
+        out[ticker] = (float(closes.iloc[0]), float(closes.iloc[-1]))
+    return out
 
-    if demo_mode:
-        score = _hash_score(f"demo:{entity}", 55, 88)
-        snap = FinancialSnapshot(
-            score=score,
-            market_cap=float(score) * 2_200_000.0,
-            price_change_7d=float((score % 24) - 8),
-            price=float(score) * 1.7,
-            revenue_estimate=float(score) * 420_000.0,
-            burn_rate=float(score) * 160_000.0,
-            source="demo",
-        )
-        return snap.as_dict()
 
-    if _is_probable_crypto(entity):
-        coin = _coingecko_lookup(entity)
-        if coin:
-            change_7d = float(coin.get("price_change_percentage_7d_in_currency") or 0.0)
-            market_cap = float(coin.get("market_cap") or 0.0)
-            price = float(coin.get("current_price") or 0.0)
-            momentum = max(-20.0, min(30.0, change_7d))
-            base = 64 + int(momentum)
-            score = max(0, min(100, base))
-            revenue = market_cap * 0.03
-            burn = max(120000.0, market_cap * 0.005)
-            return FinancialSnapshot(
-                score=score,
-                market_cap=market_cap,
-                price_change_7d=change_7d,
-                price=price,
-                revenue_estimate=revenue,
-                burn_rate=burn,
-                source="coingecko",
-            ).as_dict()
-
-    eq = _yahoo_lookup(entity)
-    if eq:
-        change_7d = float(eq.get("price_change_7d") or 0.0)
-        market_cap = float(eq.get("market_cap") or 0.0)
-        revenue = float(eq.get("revenue") or 0.0)
-        price = float(eq.get("current_price") or 0.0)
-        score = max(0, min(100, 58 + int(max(-15.0, min(22.0, change_7d)))))
-        burn = max(80000.0, (revenue * 0.012) if revenue else market_cap * 0.004)
-        return FinancialSnapshot(
-            score=score,
-            market_cap=market_cap,
-            price_change_7d=change_7d,
-            price=price,
-            revenue_estimate=revenue,
-            burn_rate=burn,
-            source="yfinance",
-        ).as_dict()
+def _demo_snapshot(entity: str) -> FinancialSnapshot:
+    score = _hash_score(f"demo:{entity}", 55, 88)
+    return FinancialSnapshot(
+        score=score,
+        market_cap=float(score) * 2_200_000.0,
+        price_change_7d=float((score % 24) - 8),
+        price=float(score) * 1.7,
+        revenue_estimate=float(score) * 420_000.0,
+        burn_rate=float(score) * 160_000.0,
+        source="demo",
+    )
+
+
+def _crypto_snapshot(coin: dict, cache_meta: Dict[str, Any]) -> FinancialSnapshot:
+    change_7d = float(coin.get("price_change_percentage_7d_in_currency") or 0.0)
+    market_cap = float(coin.get("market_cap") or 0.0)
+    price = float(coin.get("current_price") or 0.0)
+    momentum = max(-20.0, min(30.0, change_7d))
+    base = 64 + int(momentum)
+    score = max(0, min(100, base))
+    revenue = market_cap * 0.03
+    burn = max(120000.0, market_cap * 0.005)
+    return FinancialSnapshot(
+        score=score,
+        market_cap=market_cap,
+        price_change_7d=change_7d,
+        price=price,
+        revenue_estimate=revenue,
+        burn_rate=burn,
+        source="coingecko",
+        cache=cache_meta,
+    )
+
 
+def _equity_snapshot(eq: dict, cache_meta: Dict[str, Any]) -> FinancialSnapshot:
+    change_7d = float(eq.get("price_change_7d") or 0.0)
+    market_cap = float(eq.get("market_cap") or 0.0)
+    revenue = float(eq.get("revenue") or 0.0)
+    price = float(eq.get("current_price") or 0.0)
+    score = max(0, min(100, 58 + int(max(-15.0, min(22.0, change_7d)))))
+    burn = max(80000.0, (revenue * 0.012) if revenue else market_cap * 0.004)
+    return FinancialSnapshot(
+        score=score,
+        market_cap=market_cap,
+        price_change_7d=change_7d,
+        price=price,
+        revenue_estimate=revenue,
+        burn_rate=burn,
+        source="yfinance",
+        cache=cache_meta,
+    )
+
+
+def _fallback_snapshot(entity: str, cache_meta: Dict[str, Any]) -> FinancialSnapshot:
     # Resilient fallback if no provider data is available.
     seed = _hash_score(f"fallback:{entity}", 42, 74)
     return FinancialSnapshot(
@@ -166,5 +250,181 @@ def analyze_financials(entity: str, demo_mode: bool = False) -> Dict[str, Any]:
         revenue_estimate=float(seed) * 250_000.0,
         burn_rate=float(seed) * 140_000.0,
         source="fallback",
-    ).as_dict()
+        cache=cache_meta,
+        degraded="throttled" if throttled(cache_meta) else None,
+    )
+
+
+async def analyze_financials_async(entity: str, demo_mode: bool = False) -> Dict[str, Any]:
+    if not entity:
+        raise ValueError("entity is required")
+
+    if demo_mode:
+        return _demo_snapshot(entity).as_dict()
+
+    if replaying():
+        # Replay is offline: route with whatever coin list is on disk, never download one.
+        coin_index.load()
+    else:
+        await coin_index.ensure()
+    cache_meta: Dict[str, Any] = {}
+    coingecko = provider_step("coingecko", entity, lambda t: _coingecko_lookup(entity, t), cache_meta)
+    yfinance = provider_step("yfinance", entity, lambda t: asyncio.to_thread(_yahoo_lookup, entity), cache_meta)
+    route = _route(entity)
+    if route == "crypto":
+        steps = [coingecko, yfinance]
+    elif route == "both":
+        steps = [yfinance, coingecko]
+    else:
+        steps = [yfinance]
+    data, provider = await run_chain(steps)
+
+    if provider == "coingecko":
+        return _crypto_snapshot(data, cache_meta).as_dict()
+    if provider == "yfinance":
+        return _equity_snapshot(data, cache_meta).as_dict()
+    return _fallback_snapshot(entity, cache_meta).as_dict()
+
+
+def analyze_financials(entity: str, demo_mode: bool = False) -> Dict[str, Any]:
+    return run_sync(analyze_financials_async(entity, demo_mode))
+
+
+async def _bulk_coingecko(entities: List[str], metas: Dict[str, Dict[str, Any]]) -> Dict[str, dict]:
+    cache = get_cache("coingecko")
+    found: Dict[str, dict] = {}
+    pending: List[str] = []
+    for entity in entities:
+        hit = cache.peek(cache_key(entity))
+        if hit is None:
+            pending.append(entity)
+            continue
+        coin, metas[entity]["coingecko"] = hit
+        if coin:
+            found[entity] = coin
+
+    async def search(entity: str) -> Optional[str]:
+        if coin_index.ready:
+            return coin_index.resolve(entity)
+        query = entity.replace("$", "").strip()
+        try:
+            return await cached_call_async(
+                "coingecko-search",
+                entity,
+                lambda: guarded_call("coingecko", lambda t: _coingecko_search_id(query, t)),
+            )
+        except Throttled as exc:
+            metas[entity]["coingecko"] = {"status": "throttled", "retry_after": round(exc.retry_after, 1)}
+            return None
+        except ProviderFailed as exc:
+            metas[entity]["coingecko"] = {"status": "failed", "reason": exc.reason}
+            return None
+
+    coin_ids: Dict[str, str] = {}
+    for entity, coin_id in zip(pending, await asyncio.gather(*(search(e) for e in pending))):
+        metas[entity].setdefault("coingecko", {"status": "miss", "age": 0.0})
+        if coin_id:
+            coin_ids[entity] = coin_id
+    if not coin_ids:
+        return found
+    ids = sorted(set(coin_ids.values()))
+    try:
+        rows = await guarded_call("coingecko", lambda t: _coingecko_markets(ids, t)) or {}
+    except Throttled as exc:
+        # Not cached: the entities fall back now and are fetched again once the budget allows.
+        for entity in coin_ids:
+            metas[entity]["coingecko"] = {"status": "throttled", "retry_after": round(exc.retry_after, 1)}
+        return found
+    except ProviderFailed as exc:
+        # Same for a failed batch: caching None here would hide every coin until the entry expires.
+        for entity in coin_ids:
+            metas[entity]["coingecko"] = {"status": "failed", "reason": exc.reason}
+        return found
+    for entity, coin_id in coin_ids.items():
+        coin = rows.get(coin_id)
+        cache.put(cache_key(entity), coin)
+        if coin:
+            found[entity] = coin
+    return found
+
+
+def _bulk_yahoo(entities: List[str], metas: Dict[str, Dict[str, Any]]) -> Dict[str, dict]:
+    cache = get_cache("yfinance")
+    found: Dict[str, dict] = {}
+    pending: Dict[str, str] = {}
+    for entity in entities:
+        hit = cache.peek(cache_key(entity))
+        if hit is not None:
+            eq, metas[entity]["yfinance"] = hit
+            if eq:
+                found[entity] = eq
+        elif _yahoo_ticker(entity):
+            pending[entity] = _yahoo_ticker(entity)
+    try:
+        history = _yahoo_bulk_history(sorted(set(pending.values())))
+    except Throttled as exc:
+        for entity in pending:
+            metas[entity]["yfinance"] = {"status": "throttled", "retry_after": round(exc.retry_after, 1)}
+        return found
+
+    def info(ticker: str) -> dict:
+        try:
+            return cached_call("yfinance-info", ticker, lambda: _yahoo_info(ticker)) or {}
+        except Throttled:
+            return {}
+
+    # Prices come from the bulk download; only the fundamentals need per-ticker calls, fanned out here.
+    tickers = sorted({t for t in pending.values() if t in history})
+    infos: Dict[str, dict] = {}
+    if tickers:
+        with ThreadPoolExecutor(max_workers=min(YAHOO_INFO_CONCURRENCY, len(tickers))) as pool:
+            # copy_context keeps the caller's rate-limit lane in the worker threads.
+            futures = {t: pool.submit(contextvars.copy_context().run, info, t) for t in tickers}
+            infos = {t: f.result() for t, f in futures.items()}
+    for entity, ticker in pending.items():
+        metas[entity]["yfinance"] = {"status": "miss", "age": 0.0}
+        closes = history.get(ticker)
+        if closes is None:
+            cache.put(cache_key(entity), None)
+            continue
+        eq = {
+            "market_cap": float(infos[ticker].get("market_cap") or 0.0),
+            "current_price": closes[1],
+            "price_change_7d": _pct_change(*closes),
+            "revenue": float(infos[ticker].get("revenue") or 0.0),
+        }
+        cache.put(cache_key(entity), eq)
+        found[entity] = eq
+    return found
+
+
+async def analyze_financials_batch_async(entities: List[str], demo_mode: bool = False) -> Dict[str, Dict[str, Any]]:
+    entities = [e for e in entities if e]
+    if demo_mode:
+        return {e: _demo_snapshot(e).as_dict() for e in entities}
+    if replaying():
+        # Recordings are per entity, so the bulk endpoints are bypassed during replay.
+        snaps = await asyncio.gather(*(analyze_financials_async(e) for e in entities))
+        return dict(zip(entities, snaps))
+
+    await coin_index.ensure()
+    metas: Dict[str, Dict[str, Any]] = {e: {} for e in entities}
+    routes = {e: _route(e) for e in entities}
+    coins = await _bulk_coingecko([e for e in entities if routes[e] == "crypto"], metas)
+    equities = await asyncio.to_thread(_bulk_yahoo, [e for e in entities if e not in coins], metas)
+    coins.update(await _bulk_coingecko([e for e in entities if routes[e] == "both" and e not in equities], metas))
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for entity in entities:
+        if entity in coins:
+            snap = _crypto_snapshot(coins[entity], metas[entity])
+        elif entity in equities:
+            snap = _equity_snapshot(equities[entity], metas[entity])
+        else:
+            snap = _fallback_snapshot(entity, metas[entity])
+        out[entity] = snap.as_dict()
+    return out
+
 
+def analyze_financials_batch(entities: List[str], demo_mode: bool = False) -> Dict[str, Dict[str, Any]]:
+    return run_sync(analyze_financials_batch_async(entities, demo_mode))
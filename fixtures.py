@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from runtime_config import DATA_DIR
+from sqlite_local import ThreadLocalDB
+
+
+MODE = os.getenv("INVESTAI_FIXTURES", "off").lower()
+ARCHIVE_FILE = Path(os.getenv("INVESTAI_FIXTURE_ARCHIVE") or DATA_DIR / "fixtures.db")
+BUCKET_SECONDS = float(os.getenv("INVESTAI_FIXTURE_BUCKET", "3600"))
+BLOB_CACHE_SIZE = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    provider TEXT NOT NULL,
+    query TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (provider, query, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def _parse_at(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _query_key(query: Any) -> str:
+    return " ".join(str(query or "").replace("$", "").split()).lower()
+
+
+def _encode(value: Any) -> Tuple[str, bytes]:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 6)
+
+
+class FixtureArchive:
+    def __init__(self, path: Path = ARCHIVE_FILE, bucket_seconds: float = BUCKET_SECONDS) -> None:
+        self.path = Path(path)
+        self.db = ThreadLocalDB(self.path, SCHEMA)
+        self.bucket_seconds = bucket_seconds
+        self.replay_at = _parse_at(os.getenv("INVESTAI_FIXTURE_AT", ""))
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[Tuple[str, str], Tuple[List[int], List[str]]]] = None
+        self._blobs: "OrderedDict[str, Any]" = OrderedDict()
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.conn
+
+    def bucket(self, ts: Optional[float] = None) -> int:
+        return int((time.time() if ts is None else ts) // self.bucket_seconds)
+
+    def record(self, provider: str, query: Any, value: Any, ts: Optional[float] = None) -> str:
+        digest, blob = _encode(value)
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO blobs (digest, data) VALUES (?, ?)", (digest, blob))
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (provider, query, bucket, digest, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (provider, _query_key(query), self.bucket(ts), digest, time.time()),
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self.recorded += 1
+        return digest
+
+    def _load_index(self) -> Dict[Tuple[str, str], Tuple[List[int], List[str]]]:
+        # Replay reads the whole (small) entries table once; every lookup after that is a bisect.
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    index: Dict[Tuple[str, str], Tuple[List[int], List[str]]] = {}
+                    rows = self.conn.execute(
+                        "SELECT provider, query, bucket, digest FROM entries ORDER BY provider, query, bucket"
+                    ).fetchall()
+                    for provider, query, bucket, digest in rows:
+                        buckets, digests = index.setdefault((provider, query), ([], []))
+                        buckets.append(bucket)
+                        digests.append(digest)
+                    self._index = index
+        return self._index
+
+    def _blob(self, digest: str) -> Any:
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return self._blobs[digest]
+        row = self.conn.execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        value = json.loads(zlib.decompress(row[0])) if row else None
+        with self._lock:
+            self._blobs[digest] = value
+            while len(self._blobs) > BLOB_CACHE_SIZE:
+                self._blobs.popitem(last=False)
+        return value
+
+    def lookup(self, provider: str, query: Any, at: Optional[float] = None) -> Tuple[bool, Any]:
+        # The newest recording at or before the replay time; without one, the recording closest after it.
+        entry = self._load_index().get((provider, _query_key(query)))
+        if entry is None:
+            self.missing += 1
+            return False, None
+        buckets, digests = entry
+        at = self.replay_at if at is None else at
+        idx = len(buckets) - 1 if at is None else max(0, bisect.bisect_right(buckets, self.bucket(at)) - 1)
+        self.replayed += 1
+        return True, self._blob(digests[idx])
+
+    def reload(self) -> None:
+        with self._lock:
+            self._index = None
+            self._blobs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        entries, blobs = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM entries), (SELECT COUNT(*) FROM blobs)"
+        ).fetchone()
+        return {
+            "mode": MODE,
+            "path": str(self.path),
+            "entries": entries,
+            "blobs": blobs,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "missing": self.missing,
+        }
+
+
+archive = FixtureArchive()
+
+
+def replaying() -> bool:
+    return MODE == "replay"
+
+
+def fixture(provider: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # Wraps a raw provider lookup whose first argument is the entity; a no-op unless record/replay is on.
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if MODE not in ("record", "replay"):
+            return fn
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(entity: str, *args: Any, **kwargs: Any) -> Any:
+                if MODE == "replay":
+                    return archive.lookup(provider, entity)[1]
+                value = await fn(entity, *args, **kwargs)
+                await asyncio.to_thread(archive.record, provider, entity, value)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(entity: str, *args: Any, **kwargs: Any) -> Any:
+            if MODE == "replay":
+                return archive.lookup(provider, entity)[1]
+            value = fn(entity, *args, **kwargs)
+            archive.record(provider, entity, value)
+            return value
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+
+def on_starting(server) -> None:
+    # Imported here: gunicorn puts the app directory on sys.path only after reading this file.
+    import metrics
+
+    metrics.clear()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from result_store import SERIES_COLUMNS, ResultStore, entity_key
+
+
+DAY = 86400.0
+DEFAULT_DAYS = 90
+DEFAULT_POINTS = 120
+DEFAULT_WINDOW = 7
+
+
+def _frames(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    if not rows:
+        return {}
+    keys = np.array([r[0] for r in rows])
+    data = np.array([r[1:] for r in rows], dtype=float)
+    # Rows arrive ordered by entity_key, so each entity is one contiguous slice.
+    starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+    ends = np.append(starts[1:], len(keys))
+    return {str(keys[s]): data[s:e] for s, e in zip(starts, ends)}
+
+
+def downsample(frame: np.ndarray, points: int) -> np.ndarray:
+    n = len(frame)
+    if n <= points:
+        return frame
+    edges = np.linspace(0, n, points + 1).astype(int)
+    starts = edges[:-1]
+    filled = np.nan_to_num(frame, nan=0.0)
+    counts = np.add.reduceat(~np.isnan(frame), starts, axis=0)
+    sums = np.add.reduceat(filled, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    window = max(1, int(window))
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0))
+    counts = np.cumsum(valid)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def slope_per_day(ts: np.ndarray, values: np.ndarray) -> Optional[float]:
+    mask = ~np.isnan(values)
+    if mask.sum() < 2:
+        return None
+    x = (ts[mask] - ts[mask][0]) / DAY
+    y = values[mask]
+    dx = x - x.mean()
+    denom = float(np.dot(dx, dx))
+    return float(np.dot(dx, y - y.mean()) / denom) if denom else None
+
+
+def volatility(values: np.ndarray, relative: bool) -> Optional[float]:
+    v = values[~np.isnan(values)]
+    if relative:
+        v = v[v > 0]
+        if len(v) < 3:
+            return None
+        return float(np.std(np.diff(np.log(v)), ddof=1))
+    if len(v) < 3:
+        return None
+    return float(np.std(np.diff(v), ddof=1))
+
+
+def max_drawdown(values: np.ndarray) -> Optional[float]:
+    v = values[~np.isnan(values)]
+    v = v[v > 0]
+    if len(v) < 2:
+        return None
+    peaks = np.maximum.accumulate(v)
+    return float(((v - peaks) / peaks).min())
+
+
+def _round(value: Optional[float], digits: int = 4) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def _as_list(values: np.ndarray, digits: int = 4) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def summarize(frame: np.ndarray) -> Dict[str, Any]:
+    ts = frame[:, 0]
+    out: Dict[str, Any] = {"count": int(len(frame)), "first": _round(ts[0], 0), "last": _round(ts[-1], 0)}
+    for i, name in enumerate(SERIES_COLUMNS, start=1):
+        col = frame[:, i]
+        relative = name in ("price", "market_cap")
+        valid = col[~np.isnan(col)]
+        out[name] = {
+            "latest": _round(valid[-1]) if len(valid) else None,
+            "mean": _round(valid.mean()) if len(valid) else None,
+            "slope_per_day": _round(slope_per_day(ts, col)),
+            "volatility": _round(volatility(col, relative)),
+            "max_drawdown": _round(max_drawdown(col)),
+        }
+    return out
+
+
+def entity_history(
+    store: ResultStore,
+    entity: str,
+    days: float = DEFAULT_DAYS,
+    points: int = DEFAULT_POINTS,
+    window: int = DEFAULT_WINDOW,
+    mode: str = "real",
+) -> Optional[Dict[str, Any]]:
+    since = time.time() - days * DAY
+    frame = _frames(store.series([entity], since, mode=mode)).get(entity_key(entity))
+    if frame is None:
+        return None
+    sampled = downsample(frame, max(2, points))
+    series: Dict[str, Any] = {"ts": _as_list(sampled[:, 0], 0)}
+    for i, name in enumerate(SERIES_COLUMNS, start=1):
+        series[name] = _as_list(sampled[:, i])
+    for name in ("score", "social", "price"):
+        idx = 1 + SERIES_COLUMNS.index(name)
+        series[f"{name}_rolling"] = _as_list(rolling_mean(sampled[:, idx], window))
+    return {
+        "entity": entity,
+        "mode": mode,
+        "days": days,
+        "window": window,
+        "series": series,
+        "stats": summarize(frame),
+    }
+
+
+def history_summary(
+    store: ResultStore, entities: Sequence[str], days: float = DEFAULT_DAYS, mode: str = "real"
+) -> Dict[str, Any]:
+    since = time.time() - days * DAY
+    return {key: summarize(frame) for key, frame in _frames(store.series(entities, since, mode=mode)).items()}
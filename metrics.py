@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from runtime_config import DATA_DIR
+
+METRICS_DIR = DATA_DIR / "metrics"
+ENABLED = os.getenv("INVESTAI_METRICS", "1").lower() not in {"0", "false", "no", "off"}
+FLUSH_SECONDS = 5.0
+# A snapshot not rewritten for a few flushes belongs to a worker that is gone; it no longer counts.
+STALE_SECONDS = FLUSH_SECONDS * 6
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "stage": "Duration of each run_research stage.",
+    "provider": "Duration of provider lookups including the response cache.",
+    "upstream": "Duration of network calls to upstream providers.",
+    "http": "Duration of HTTP requests served by this app.",
+}
+
+_lock = threading.Lock()
+_hist: Dict[str, List[float]] = {}
+_counters: Dict[str, float] = {}
+_flusher_pid: Optional[int] = None
+_current: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("investai_timings", default=None)
+
+
+def _key(kind: str, labels: Dict[str, str]) -> str:
+    return json.dumps([kind, sorted(labels.items())], separators=(",", ":"))
+
+
+def observe(kind: str, seconds: float, **labels: str) -> None:
+    if not ENABLED:
+        return
+    key = _key(kind, labels)
+    with _lock:
+        row = _hist.get(key)
+        if row is None:
+            # Bucket counts, then the +Inf overflow, then sum and count.
+            row = [0.0] * (len(BUCKETS) + 3)
+            _hist[key] = row
+        row[bisect.bisect_left(BUCKETS, seconds)] += 1
+        row[-2] += seconds
+        row[-1] += 1
+    _ensure_flusher()
+
+
+def incr(name: str, value: float = 1.0, **labels: str) -> None:
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+    _ensure_flusher()
+
+
+class Span:
+    __slots__ = ("kind", "labels", "outcome", "started")
+
+    def __init__(self, kind: str, outcome: str, labels: Dict[str, str]) -> None:
+        self.kind = kind
+        self.labels = labels
+        self.outcome = outcome
+        self.started = 0.0
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self.started
+        if exc_type is not None and self.outcome == "ok":
+            self.outcome = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+        observe(self.kind, elapsed, outcome=self.outcome, **self.labels)
+        timings = _current.get()
+        if timings is not None:
+            timings.append({"kind": self.kind, **self.labels, "outcome": self.outcome, "ms": round(elapsed * 1000, 2)})
+
+
+class _NoopSpan:
+    __slots__ = ("outcome",)
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def span(kind: str, outcome: str = "ok", **labels: str):
+    if not ENABLED and _current.get() is None:
+        return _NOOP
+    return Span(kind, outcome, labels)
+
+
+async def collect_timings(coro: Awaitable[Any]) -> Tuple[Any, List[Dict[str, Any]]]:
+    # Runs inside the task that executes the coroutine, so child tasks and to_thread calls inherit it.
+    timings: List[Dict[str, Any]] = []
+    token = _current.set(timings)
+    try:
+        return await coro, timings
+    finally:
+        _current.reset(token)
+
+
+def _snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {"hist": {k: list(v) for k, v in _hist.items()}, "counters": dict(_counters)}
+
+
+def flush() -> None:
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    path = METRICS_DIR / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(_snapshot(), separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception:
+            pass
+
+
+def _ensure_flusher() -> None:
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _discard(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def clear() -> None:
+    # Run by the gunicorn master before it forks: snapshots left by a previous run are no current worker's.
+    if METRICS_DIR.exists():
+        for path in METRICS_DIR.iterdir():
+            _discard(path)
+
+
+def aggregate() -> Dict[str, Any]:
+    merged: Dict[str, Any] = {"hist": {}, "counters": {}}
+    own = f"{os.getpid()}.json"
+    snapshots = [_snapshot()]
+    now = time.time()
+    if METRICS_DIR.exists():
+        for path in METRICS_DIR.glob("*.json"):
+            if path.name == own:
+                continue
+            try:
+                stale = now - path.stat().st_mtime > STALE_SECONDS or not _alive(int(path.stem))
+            except (OSError, ValueError):
+                continue
+            if stale:
+                # A recycled worker's counts leave the totals, which Prometheus reads as a counter reset.
+                _discard(path)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+            except Exception:
+                continue
+    for snap in snapshots:
+        for key, row in snap.get("hist", {}).items():
+            acc = merged["hist"].setdefault(key, [0.0] * len(row))
+            for i, v in enumerate(row):
+                acc[i] += v
+        for key, value in snap.get("counters", {}).items():
+            merged["counters"][key] = merged["counters"].get(key, 0.0) + value
+    return merged
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: List[List[str]], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [(k, v) for k, v in labels]
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_prometheus() -> str:
+    data = aggregate()
+    lines: List[str] = []
+    by_kind: Dict[str, List[Tuple[List[List[str]], List[float]]]] = {}
+    for key, row in data["hist"].items():
+        kind, labels = json.loads(key)
+        by_kind.setdefault(kind, []).append((labels, row))
+    for kind in sorted(by_kind):
+        name = f"investai_{kind}_duration_seconds"
+        lines.append(f"# HELP {name} {HELP.get(kind, kind)}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, row in sorted(by_kind[kind]):
+            cumulative = 0.0
+            for bound, count in zip(BUCKETS, row):
+                cumulative += count
+                lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', repr(bound)))} {_fmt_num(cumulative)}")
+            cumulative += row[len(BUCKETS)]
+            lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {_fmt_num(cumulative)}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {row[-2]!r}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {_fmt_num(row[-1])}")
+    counters: Dict[str, List[Tuple[List[List[str]], float]]] = {}
+    for key, value in data["counters"].items():
+        name, labels = json.loads(key)
+        counters.setdefault(name, []).append((labels, value))
+    for name in sorted(counters):
+        metric = f"investai_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(counters[name]):
+            lines.append(f"{metric}{_fmt_labels(labels)} {_fmt_num(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024.0, 1)
+    except Exception:
+        pass
+    return None
+
+
+def process_age() -> Optional[float]:
+    # Seconds since this process was created (a gunicorn worker: since its fork), from /proc on Linux.
+    try:
+        start_ticks = int(Path("/proc/self/stat").read_text().rsplit(")", 1)[1].split()[19])
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+        return round(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 3)
+    except Exception:
+        return None
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from shared_cache import SharedCache, shared_cache
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float = 120.0
+    stale_ttl: float = 900.0
+    negative_ttl: float = 30.0
+    max_size: int = 512
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    "coingecko": CachePolicy(ttl=60.0, stale_ttl=600.0, negative_ttl=30.0, max_size=1024),
+    "coingecko-search": CachePolicy(ttl=86400.0, stale_ttl=86400.0, negative_ttl=300.0, max_size=4096),
+    "yfinance": CachePolicy(ttl=300.0, stale_ttl=1800.0, negative_ttl=60.0, max_size=1024),
+    "yfinance-info": CachePolicy(ttl=3600.0, stale_ttl=21600.0, negative_ttl=300.0, max_size=2048),
+    "praw": CachePolicy(ttl=300.0, stale_ttl=1800.0, negative_ttl=60.0, max_size=512),
+    "reddit-public": CachePolicy(ttl=300.0, stale_ttl=1800.0, negative_ttl=60.0, max_size=512),
+}
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_shared_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-shared")
+_refresh_tasks: set = set()
+
+
+class ProviderCache:
+    def __init__(self, name: str, policy: CachePolicy | None = None, shared: Optional[SharedCache] = shared_cache) -> None:
+        self.name = name
+        self.policy = policy or DEFAULT_POLICIES.get(name, CachePolicy())
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _store(self, key: str, value: Any, age: float = 0.0, share: bool = True) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() - age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.policy.max_size:
+                self._entries.popitem(last=False)
+        if share and self.shared is not None:
+            keep = self.policy.ttl + self.policy.stale_ttl if value is not None else self.policy.negative_ttl
+            # Written off-thread so a busy cache file never stalls a request or the event loop.
+            _shared_pool.submit(self.shared.set, self.name, key, value, keep, time.time() - age)
+
+    def _fresh_for(self, value: Any) -> float:
+        return self.policy.ttl if value is not None else self.policy.negative_ttl
+
+    def _from_shared(self, key: str) -> Optional[Tuple[Any, float]]:
+        # L2: another worker may already hold a fresher copy than this process.
+        if self.shared is None:
+            return None
+        found = self.shared.get(self.name, key)
+        if found is None:
+            return None
+        value, stored_at = found
+        return value, max(0.0, time.time() - stored_at)
+
+    def _refresh(self, key: str, fetch: Callable[[], Any]) -> None:
+        try:
+            value = fetch()
+            # Keep serving the stale value rather than replacing it with a failed refresh.
+            if value is not None:
+                self._store(key, value)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _arefresh(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            value = await fetch()
+            if value is not None:
+                self._store(key, value)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _lookup(self, key: str) -> Tuple[str, Any, float]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+        if entry is None or age >= self._fresh_for(value):
+            shared = self._from_shared(key)
+            if shared is not None and (entry is None or shared[1] < age):
+                value, age = shared
+                self._store(key, value, age, share=False)
+                self.shared_hits += 1
+            elif entry is None:
+                return "miss", None, 0.0
+        if age < self._fresh_for(value):
+            self.hits += 1
+            return "hit", value, age
+        if value is not None and age < self.policy.ttl + self.policy.stale_ttl:
+            self.stale_hits += 1
+            return "stale", value, age
+        return "miss", None, 0.0
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        status, value, age = self._lookup(key)
+        if status == "stale" and self._claim_refresh(key):
+            _refresh_pool.submit(self._refresh, key, fetch)
+        if status != "miss":
+            return value, self._meta(status, age)
+        self.misses += 1
+        value = fetch()
+        self._store(key, value)
+        return value, self._meta("miss", 0.0)
+
+    async def aget(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, Any]]:
+        status, value, age = self._lookup(key)
+        if status == "stale" and self._claim_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._arefresh(key, fetch))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        if status != "miss":
+            return value, self._meta(status, age)
+        self.misses += 1
+        value = await fetch()
+        self._store(key, value)
+        return value, self._meta("miss", 0.0)
+
+    def peek(self, key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+        if entry is None or age >= self._fresh_for(value):
+            entry = self._from_shared(key)
+            if entry is None:
+                return None
+            value, age = entry
+            self._store(key, value, age, share=False)
+            self.shared_hits += 1
+        if age >= self._fresh_for(value):
+            return None
+        self.hits += 1
+        return value, self._meta("hit", age)
+
+    def put(self, key: str, value: Any) -> None:
+        self._store(key, value)
+
+    def _meta(self, status: str, age: float) -> Dict[str, Any]:
+        return {"status": status, "age": round(age, 3)}
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self.name, key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.policy.max_size,
+            "ttl": self.policy.ttl,
+            "stale_ttl": self.policy.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+        }
+
+
+_caches: Dict[str, ProviderCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> ProviderCache:
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = ProviderCache(name)
+            _caches[name] = cache
+        return cache
+
+
+def register_cache(cache: ProviderCache) -> ProviderCache:
+    with _caches_lock:
+        _caches[cache.name] = cache
+    return cache
+
+
+def configure_cache(name: str, **overrides: Any) -> ProviderCache:
+    cache = get_cache(name)
+    cache.policy = replace(cache.policy, **overrides)
+    return cache
+
+
+def cache_key(entity: str) -> str:
+    return " ".join((entity or "").replace("$", "").split()).lower()
+
+
+def cached_call(provider: str, entity: str, fetch: Callable[[], Any], meta: Dict[str, Any] | None = None) -> Any:
+    value, info = get_cache(provider).get(cache_key(entity), fetch)
+    if meta is not None:
+        meta[provider] = info
+    return value
+
+
+async def cached_call_async(
+    provider: str,
+    entity: str,
+    fetch: Callable[[], Awaitable[Any]],
+    meta: Dict[str, Any] | None = None,
+) -> Any:
+    value, info = await get_cache(provider).aget(cache_key(entity), fetch)
+    if meta is not None:
+        meta[provider] = info
+    return value
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {c.name: c.stats() for c in caches}
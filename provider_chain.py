@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fixtures import replaying
+from metrics import incr, span
+from provider_cache import cached_call_async
+from rate_limiter import Throttled, rate_limiter, throttle_delay
+
+
+CHAIN_MODE = os.getenv("INVESTAI_CHAIN_MODE", "hedge").lower()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_after: float = 30.0,
+        max_reset_after: float = 300.0,
+        min_timeout: float = 1.5,
+        max_timeout: float = 12.0,
+        window: int = 50,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_after = reset_after
+        self.reset_after = reset_after
+        self.max_reset_after = max_reset_after
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.latencies: deque = deque(maxlen=window)
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = "closed"
+            self.reset_after = self.base_reset_after
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == "half_open":
+                # A failed probe keeps the circuit open for longer each time.
+                self.reset_after = min(self.max_reset_after, self.reset_after * 2)
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def timeout(self) -> float:
+        samples = list(self.latencies)
+        if len(samples) < 8:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, _percentile(samples, 0.95) * 3.0))
+
+    def hedge_delay(self) -> float:
+        samples = list(self.latencies)
+        if len(samples) < 8:
+            return 2.0
+        return max(0.25, min(4.0, _percentile(samples, 0.9)))
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self.latencies)
+        return {
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "timeout": round(self.timeout(), 3),
+            "hedge_delay": round(self.hedge_delay(), 3),
+            "p50": round(_percentile(samples, 0.5), 3) if samples else None,
+            "p95": round(_percentile(samples, 0.95), 3) if samples else None,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
+
+
+class ProviderFailed(Exception):
+    # Raised instead of returning None so a failure is never cached as "no data" (like Throttled).
+    def __init__(self, provider: str, reason: str) -> None:
+        super().__init__(f"{provider} failed: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+async def guarded_call(name: str, fetch: Callable[[float], Awaitable[Any]]) -> Any:
+    breaker = get_breaker(name)
+    if replaying():
+        # A recorded response says nothing about the live provider: no breaker state, no token bucket.
+        return await fetch(breaker.timeout())
+    if not breaker.allow():
+        incr("breaker_skips", provider=name)
+        raise ProviderFailed(name, "breaker_open")
+    try:
+        await rate_limiter.acquire(name)
+    except BaseException as exc:
+        breaker.release()
+        if isinstance(exc, Throttled):
+            incr("throttled", provider=name)
+        raise
+    timeout = breaker.timeout()
+    started = time.monotonic()
+    with span("upstream", provider=name) as sp:
+        try:
+            value = await asyncio.wait_for(fetch(timeout), timeout)
+        except asyncio.CancelledError:
+            # A hedged loser being cancelled says nothing about the provider's health.
+            breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            sp.outcome = "timeout"
+            breaker.record_failure()
+            raise ProviderFailed(name, "timeout") from None
+        except Exception as exc:
+            delay = throttle_delay(exc)
+            if delay is not None:
+                # A 429 is a budget problem, not an outage: stop every worker, leave the breaker alone.
+                sp.outcome = "throttled"
+                breaker.release()
+                rate_limiter.block(name, delay)
+                incr("throttled", provider=name)
+                raise Throttled(name, delay) from None
+            sp.outcome = "error"
+            breaker.record_failure()
+            raise ProviderFailed(name, "error") from None
+        sp.outcome = "ok" if value is not None else "empty"
+    breaker.record_success(time.monotonic() - started)
+    return value
+
+
+@dataclass
+class ProviderStep:
+    name: str
+    run: Callable[[], Awaitable[Any]]
+
+
+def provider_step(
+    name: str,
+    entity: str,
+    fetch: Callable[[float], Awaitable[Any]],
+    cache_meta: Dict[str, Any],
+) -> ProviderStep:
+    async def run() -> Any:
+        with span("provider", provider=name) as sp:
+            try:
+                value = await cached_call_async(name, entity, lambda: guarded_call(name, fetch), cache_meta)
+            except Throttled as exc:
+                # Nothing is cached for a throttled call; the meta tells the caller why it fell back.
+                cache_meta[name] = {"status": "throttled", "retry_after": round(exc.retry_after, 1)}
+                sp.outcome = "throttled"
+                return None
+            except ProviderFailed as exc:
+                # Not cached either: the next call, in any worker, tries the provider again.
+                cache_meta[name] = {"status": "failed", "reason": exc.reason}
+                sp.outcome = exc.reason
+                return None
+            sp.outcome = cache_meta.get(name, {}).get("status", "miss") if value is not None else "empty"
+            return value
+
+    return ProviderStep(name, run)
+
+
+def throttled(cache_meta: Dict[str, Any]) -> List[str]:
+    return sorted(name for name, info in cache_meta.items() if isinstance(info, dict) and info.get("status") == "throttled")
+
+
+async def run_chain(steps: List[ProviderStep], mode: Optional[str] = None) -> Tuple[Any, Optional[str]]:
+    mode = (mode or CHAIN_MODE).lower()
+    if not steps:
+        return None, None
+    loop = asyncio.get_running_loop()
+    running: Dict[asyncio.Task, ProviderStep] = {}
+    next_idx = 0
+
+    def launch() -> None:
+        nonlocal next_idx
+        step = steps[next_idx]
+        next_idx += 1
+        running[loop.create_task(step.run())] = step
+
+    launch()
+    if mode == "race":
+        while next_idx < len(steps):
+            launch()
+
+    try:
+        while running:
+            wait_for: Optional[float] = None
+            if mode == "hedge" and next_idx < len(steps):
+                wait_for = get_breaker(steps[next_idx - 1].name).hedge_delay()
+            done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Latency budget spent: start the next provider alongside the slow one.
+                launch()
+                continue
+            # When several finish together, the earlier (preferred) provider wins.
+            for task in sorted(done, key=lambda t: steps.index(running[t])):
+                step = running.pop(task)
+                value = None if task.cancelled() or task.exception() is not None else task.result()
+                if value is not None:
+                    return value, step.name
+            if next_idx < len(steps) and (mode == "hedge" or not running):
+                launch()
+        return None, None
+    finally:
+        for task in running:
+            task.cancel()
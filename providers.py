@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+# Heavy third-party libraries are imported on first real use, never at module import time:
+# yfinance drags in pandas and numpy, and demo-mode workers never touch any of them.
+LIBRARIES = {
+    "yfinance": "yfinance",
+    "praw": "praw",
+    "numpy": "numpy",
+}
+
+
+class ProviderRegistry:
+    def __init__(self, libraries: Optional[Dict[str, str]] = None) -> None:
+        self.libraries = dict(libraries or LIBRARIES)
+        self._modules: Dict[str, Any] = {}
+        self._import_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def available(self, name: str) -> bool:
+        # Answers "is it installed" without paying for the import.
+        if name in self._modules:
+            return self._modules[name] is not None
+        try:
+            return importlib.util.find_spec(self.libraries[name]) is not None
+        except Exception:
+            return False
+
+    def get(self, name: str) -> Optional[Any]:
+        if name in self._modules:
+            return self._modules[name]
+        with self._lock:
+            if name not in self._modules:
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(self.libraries[name])
+                except Exception as exc:
+                    module = None
+                    self._errors[name] = f"{type(exc).__name__}: {exc}"
+                self._import_seconds[name] = time.perf_counter() - started
+                self._modules[name] = module
+        return self._modules[name]
+
+    def disable(self, name: str) -> None:
+        with self._lock:
+            self._modules[name] = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name in self.libraries:
+            seconds = self._import_seconds.get(name)
+            out[name] = {
+                # sys.modules also catches a library some other module imported directly.
+                "loaded": self.libraries[name] in sys.modules,
+                "available": self.available(name),
+                "import_seconds": round(seconds, 3) if seconds is not None else None,
+                "error": self._errors.get(name),
+            }
+        return out
+
+
+registry = ProviderRegistry()
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from fixtures import replaying
+from runtime_config import DATA_DIR
+from sqlite_local import ThreadLocalDB
+
+
+ENABLED = os.getenv("INVESTAI_RATE_LIMIT", "1").lower() not in {"0", "false", "no", "off"}
+LIMITS_FILE = DATA_DIR / "ratelimit.db"
+DEFAULT_RETRY_AFTER = 30.0
+POLL_SECONDS = 1.0
+
+# Interactive requests (the default) may spend every token; batch and scheduler work runs in the background lane.
+LANE: contextvars.ContextVar[str] = contextvars.ContextVar("investai_lane", default=os.getenv("INVESTAI_LANE", "interactive"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class BucketPolicy:
+    rate: float
+    burst: float
+    reserve: float = 0.3
+    interactive_wait: float = 3.0
+    background_wait: float = 120.0
+
+
+DEFAULT_BUCKETS: Dict[str, BucketPolicy] = {
+    "coingecko": BucketPolicy(rate=0.4, burst=8),
+    "yahoo": BucketPolicy(rate=2.0, burst=10),
+    "reddit": BucketPolicy(rate=0.15, burst=5),
+    "reddit-oauth": BucketPolicy(rate=1.0, burst=10),
+}
+
+PROVIDER_BUCKETS = {
+    "coingecko": "coingecko",
+    "coingecko-search": "coingecko",
+    "yfinance": "yahoo",
+    "yfinance-info": "yahoo",
+    "reddit-public": "reddit",
+    "praw": "reddit-oauth",
+}
+
+
+class Throttled(Exception):
+    def __init__(self, provider: str, retry_after: float) -> None:
+        super().__init__(f"{provider} is rate limited for another {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    token = LANE.set(name)
+    try:
+        yield
+    finally:
+        LANE.reset(token)
+
+
+def parse_retry_after(value: Any, default: float = DEFAULT_RETRY_AFTER) -> float:
+    # Retry-After is either delta-seconds or an HTTP date.
+    if value is None or value == "":
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except Exception:
+        return default
+
+
+def throttle_delay(exc: BaseException) -> Optional[float]:
+    # 429s surface as httpx errors, yfinance's YFRateLimitError or prawcore's TooManyRequests.
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429 or type(exc).__name__ in {"YFRateLimitError", "TooManyRequests"}:
+        headers = getattr(response, "headers", None) or {}
+        return parse_retry_after(headers.get("Retry-After"))
+    return None
+
+
+class RateLimiter:
+    def __init__(self, path: Path = LIMITS_FILE, enabled: bool = ENABLED) -> None:
+        self.path = Path(path)
+        self.db = ThreadLocalDB(self.path, SCHEMA, timeout=5, synchronous="OFF")
+        self.enabled = enabled
+        self.policies: Dict[str, BucketPolicy] = dict(DEFAULT_BUCKETS)
+        self._lock = threading.Lock()
+        self.granted: Dict[str, int] = {}
+        self.waited: Dict[str, float] = {}
+        self.throttled: Dict[str, int] = {}
+        self.blocked: Dict[str, int] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.conn
+
+    def configure(self, bucket: str, **overrides: Any) -> BucketPolicy:
+        policy = replace(self.policies.get(bucket) or BucketPolicy(rate=1.0, burst=1.0), **overrides)
+        self.policies[bucket] = policy
+        return policy
+
+    def _count(self, counter: Dict[str, Any], bucket: str, amount: float = 1) -> None:
+        with self._lock:
+            counter[bucket] = counter.get(bucket, 0) + amount
+
+    def _take(self, bucket: str, lane: str) -> float:
+        # One short write transaction per attempt keeps every worker process on the same bucket.
+        policy = self.policies[bucket]
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT tokens, updated_at, blocked_until FROM buckets WHERE name = ?", (bucket,)).fetchone()
+            tokens, updated_at, blocked_until = row if row else (policy.burst, now, 0.0)
+            tokens = min(policy.burst, tokens + max(0.0, now - updated_at) * policy.rate)
+            floor = 0.0 if lane == "interactive" else policy.burst * policy.reserve
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif tokens - 1.0 >= floor:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (floor + 1.0 - tokens) / policy.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)",
+                (bucket, tokens, now, blocked_until),
+            )
+        return wait
+
+    def _next(self, provider: str, bucket: str, lane: str, spent: float) -> float:
+        try:
+            wait = self._take(bucket, lane)
+        except sqlite3.Error:
+            # Fail open: a locked or broken limiter file must not take the providers down with it.
+            wait = 0.0
+        if wait <= 0:
+            self._count(self.granted, bucket)
+            return 0.0
+        policy = self.policies[bucket]
+        budget = policy.interactive_wait if lane == "interactive" else policy.background_wait
+        if spent + wait > budget:
+            self._count(self.throttled, bucket)
+            raise Throttled(provider, wait)
+        self._count(self.waited, bucket, min(wait, POLL_SECONDS))
+        return min(wait, POLL_SECONDS)
+
+    def _bucket(self, provider: str) -> Optional[str]:
+        bucket = PROVIDER_BUCKETS.get(provider)
+        # Replayed fixtures never reach the upstream, so they neither wait for nor spend live tokens.
+        if not self.enabled or bucket not in self.policies or replaying():
+            return None
+        return bucket
+
+    async def acquire(self, provider: str) -> None:
+        bucket = self._bucket(provider)
+        if bucket is None:
+            return
+        lane, spent = LANE.get(), 0.0
+        while True:
+            delay = await asyncio.to_thread(self._next, provider, bucket, lane, spent)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+            spent += delay
+
+    def acquire_sync(self, provider: str) -> None:
+        bucket = self._bucket(provider)
+        if bucket is None:
+            return
+        lane, spent = LANE.get(), 0.0
+        while True:
+            delay = self._next(provider, bucket, lane, spent)
+            if not delay:
+                return
+            time.sleep(delay)
+            spent += delay
+
+    def block(self, provider: str, retry_after: float) -> None:
+        # The upstream said stop: nobody in any worker gets a token until Retry-After has passed.
+        bucket = self._bucket(provider)
+        if bucket is None:
+            return
+        now = time.time()
+        try:
+            self.conn.execute(
+                "INSERT INTO buckets (name, tokens, updated_at, blocked_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = 0, updated_at = excluded.updated_at, "
+                "blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (bucket, now, now + retry_after),
+            )
+        except Exception:
+            pass
+        self._count(self.blocked, bucket)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            rows = self.conn.execute("SELECT name, tokens, updated_at, blocked_until FROM buckets").fetchall()
+        except Exception:
+            rows = []
+        state = {name: (tokens, updated_at, blocked_until) for name, tokens, updated_at, blocked_until in rows}
+        now = time.time()
+        out: Dict[str, Any] = {"enabled": self.enabled, "lane": LANE.get(), "buckets": {}}
+        for name, policy in self.policies.items():
+            tokens, updated_at, blocked_until = state.get(name, (policy.burst, now, 0.0))
+            out["buckets"][name] = {
+                "rate": policy.rate,
+                "burst": policy.burst,
+                "tokens": round(min(policy.burst, tokens + max(0.0, now - updated_at) * policy.rate), 2),
+                "blocked_for": round(max(0.0, blocked_until - now), 1),
+                "granted": self.granted.get(name, 0),
+                "waited_seconds": round(self.waited.get(name, 0.0), 2),
+                "throttled": self.throttled.get(name, 0),
+                "blocked": self.blocked.get(name, 0),
+            }
+        return out
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from providers import registry
+from result_store import entity_key
+from runtime_config import DATA_DIR
+from sqlite_local import ThreadLocalDB
+
+
+POSTS_FILE = DATA_DIR / "reddit.db"
+WINDOW_SECONDS = float(os.getenv("INVESTAI_REDDIT_WINDOW_DAYS", "30")) * 86400.0
+MAX_POSTS = int(os.getenv("INVESTAI_REDDIT_MAX_POSTS", "1000"))
+# A periodic listing without the "before" marker recovers from a marker post that has since been deleted.
+RESYNC_SECONDS = float(os.getenv("INVESTAI_REDDIT_RESYNC_SECONDS", "21600"))
+# Stored posts are fetched fresh with near-zero scores; each call re-reads the scores of the stalest ones by id.
+REFRESH_SECONDS = float(os.getenv("INVESTAI_REDDIT_REFRESH_SECONDS", "3600"))
+REFRESH_BATCH = 100
+POSITIVE_SCORE = 20
+CLIENTS_PER_KEY = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    entity_key TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    score INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    refreshed_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity_key, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(entity_key, created_utc);
+CREATE INDEX IF NOT EXISTS idx_posts_score ON posts(entity_key, score);
+CREATE INDEX IF NOT EXISTS idx_posts_refreshed ON posts(entity_key, refreshed_at);
+CREATE TABLE IF NOT EXISTS aggregates (
+    entity_key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    positive INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    newest_id TEXT NOT NULL DEFAULT '',
+    newest_created REAL NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(posts)")}
+    if columns and "refreshed_at" not in columns:
+        # Files written before score refreshes existed: every stored post starts out due.
+        conn.execute("ALTER TABLE posts ADD COLUMN refreshed_at REAL NOT NULL DEFAULT 0")
+
+
+def _positive(score: int) -> int:
+    return 1 if score > POSITIVE_SCORE else 0
+
+
+class RedditPostStore:
+    def __init__(
+        self,
+        path: Path = POSTS_FILE,
+        window: float = WINDOW_SECONDS,
+        max_posts: int = MAX_POSTS,
+        resync: float = RESYNC_SECONDS,
+        refresh: float = REFRESH_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.db = ThreadLocalDB(self.path, SCHEMA, migrate=_migrate)
+        self.window = window
+        self.max_posts = max_posts
+        self.resync = resync
+        self.refresh = refresh
+        self.ingested = 0
+        self.full_fetches = 0
+        self.incremental_fetches = 0
+        self.refreshed = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.conn
+
+    def plan(self, entity: str, now: Optional[float] = None) -> Tuple[Optional[str], List[str]]:
+        # Returns the listing marker (fullname of the newest stored post; listings "before" it hold only newer
+        # posts) and the fullnames of the stored posts whose scores are due to be re-read.
+        key = entity_key(entity)
+        now = time.time() if now is None else now
+        row = self.conn.execute("SELECT newest_id, synced_at FROM aggregates WHERE entity_key = ?", (key,)).fetchone()
+        stale = self.conn.execute(
+            "SELECT post_id FROM posts WHERE entity_key = ? AND refreshed_at <= ? ORDER BY refreshed_at LIMIT ?",
+            (key, now - self.refresh, REFRESH_BATCH),
+        ).fetchall()
+        refresh = [f"t3_{r[0]}" for r in stale]
+        if not row or not row[0] or now - row[1] >= self.resync:
+            self.full_fetches += 1
+            return None, refresh
+        self.incremental_fetches += 1
+        return f"t3_{row[0]}", refresh
+
+    def ingest(
+        self,
+        entity: str,
+        posts: Iterable[Dict[str, Any]],
+        full: bool = False,
+        checked: Sequence[str] = (),
+        now: Optional[float] = None,
+    ) -> int:
+        # Aggregates move by deltas: new posts add, re-seen posts adjust by their score change, and only
+        # the posts leaving the window (or over the cap) are read back to be subtracted.
+        key = entity_key(entity)
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        added = 0
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT count, positive, score_sum, newest_id, newest_created, synced_at FROM aggregates "
+                "WHERE entity_key = ?",
+                (key,),
+            ).fetchone()
+            count, positive, score_sum, newest_id, newest_created, synced_at = row or (0, 0, 0, "", 0.0, 0.0)
+            for post in posts:
+                post_id = str(post.get("id") or "")
+                created = float(post.get("created_utc") or 0.0)
+                if not post_id or created < cutoff:
+                    continue
+                score = int(post.get("score") or 0)
+                old = conn.execute(
+                    "SELECT score FROM posts WHERE entity_key = ? AND post_id = ?", (key, post_id)
+                ).fetchone()
+                if old is None:
+                    conn.execute(
+                        "INSERT INTO posts (entity_key, post_id, created_utc, score, title, refreshed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, post_id, created, score, str(post.get("title") or "").strip(), now),
+                    )
+                    count, positive, score_sum = count + 1, positive + _positive(score), score_sum + score
+                    added += 1
+                else:
+                    conn.execute(
+                        "UPDATE posts SET score = ?, refreshed_at = ? WHERE entity_key = ? AND post_id = ?",
+                        (score, now, key, post_id),
+                    )
+                    positive += _positive(score) - _positive(old[0])
+                    score_sum += score - old[0]
+                if created > newest_created or (created == newest_created and post_id > newest_id):
+                    newest_id, newest_created = post_id, created
+            # Requested posts Reddit no longer returns (removed, deleted) wait a full interval like the rest.
+            conn.executemany(
+                "UPDATE posts SET refreshed_at = ? WHERE entity_key = ? AND post_id = ?",
+                [(now, key, fullname[3:]) for fullname in checked],
+            )
+            expired = conn.execute(
+                "SELECT post_id, score FROM posts WHERE entity_key = ? AND created_utc < ?", (key, cutoff)
+            ).fetchall()
+            if count - len(expired) > self.max_posts:
+                expired += conn.execute(
+                    "SELECT post_id, score FROM posts WHERE entity_key = ? AND created_utc >= ? "
+                    "ORDER BY created_utc LIMIT ?",
+                    (key, cutoff, count - len(expired) - self.max_posts),
+                ).fetchall()
+            for post_id, score in expired:
+                conn.execute("DELETE FROM posts WHERE entity_key = ? AND post_id = ?", (key, post_id))
+                count, positive, score_sum = count - 1, positive - _positive(score), score_sum - score
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO aggregates
+                    (entity_key, count, positive, score_sum, newest_id, newest_created, synced_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, count, positive, score_sum, newest_id, newest_created, now if full else synced_at, now),
+            )
+        self.ingested += added
+        self.refreshed += len(checked)
+        return added
+
+    def aggregate(self, entity: str) -> Optional[Dict[str, Any]]:
+        key = entity_key(entity)
+        row = self.conn.execute(
+            "SELECT count, positive, score_sum FROM aggregates WHERE entity_key = ?", (key,)
+        ).fetchone()
+        if not row or not row[0]:
+            return None
+        count, positive, score_sum = row
+        top = self.conn.execute(
+            "SELECT title FROM posts WHERE entity_key = ? ORDER BY score DESC LIMIT 1", (key,)
+        ).fetchone()
+        ratio = positive / count
+        return {
+            "ratio": ratio,
+            "intensity": max(0, min(100, int((score_sum / count) / 8 + ratio * 40))),
+            "top_post": top[0] if top and top[0] else "No significant thread",
+            "sample_size": count,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entities, posts = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(count), 0) FROM aggregates").fetchone()
+        except Exception:
+            entities, posts = 0, 0
+        return {
+            "entities": entities,
+            "posts": posts,
+            "ingested": self.ingested,
+            "full_fetches": self.full_fetches,
+            "incremental_fetches": self.incremental_fetches,
+            "refreshed": self.refreshed,
+        }
+
+
+class RedditClientPool:
+    def __init__(self, size: int = CLIENTS_PER_KEY) -> None:
+        self.size = size
+        self._pools: Dict[Tuple[str, str, str], Tuple["queue.LifoQueue[Any]", List[int]]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    @contextmanager
+    def client(self, client_id: str, client_secret: str, user_agent: str) -> Iterator[Any]:
+        # praw.Reddit is not thread-safe, so each thread borrows its own instance; instances live for the
+        # whole process and keep their OAuth token, which praw refreshes on its own when it expires.
+        praw = registry.get("praw")
+        if praw is None:
+            raise RuntimeError("praw is not installed")
+        key = (client_id, client_secret, user_agent or "InvestAI/1.0")
+        with self._lock:
+            idle, made = self._pools.setdefault(key, (queue.LifoQueue(), [0]))
+            create = idle.empty() and made[0] < self.size
+            if create:
+                made[0] += 1
+                self.created += 1
+        if create:
+            try:
+                reddit = praw.Reddit(client_id=key[0], client_secret=key[1], user_agent=key[2])
+            except Exception:
+                with self._lock:
+                    made[0] -= 1
+                raise
+        else:
+            reddit = idle.get()
+        try:
+            yield reddit
+        finally:
+            idle.put(reddit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"clients": sum(made[0] for _, made in self._pools.values()), "created": self.created}
+
+
+post_store = RedditPostStore()
+client_pool = RedditClientPool()
@@ -2,44 +2,50 @@ from __future__ import annotations
 
 import asyncio
 import json
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
 
-from financial_analyzer import analyze_financials
+from financial_analyzer import analyze_financials_async, analyze_financials_batch_async
 from founder_checker import check_founders
-from sentiment_engine import get_social_sentiment
+from metrics import span
+from rate_limiter import lane
+from result_store import ResultStore
+from runtime_config import DATA_DIR
+from sentiment_engine import get_social_sentiment_async
+from settings_store import settings_store
+from singleflight import SingleFlight
 
 
-APP_DIR = Path(__file__).resolve().parent
-DATA_DIR = APP_DIR / "data"
 RESULTS_FILE = DATA_DIR / "results.json"
 WATCHLIST_FILE = DATA_DIR / "watchlist.json"
-SETTINGS_FILE = DATA_DIR / "settings.json"
+DB_FILE = DATA_DIR / "investai.db"
+LOCKS_DIR = DATA_DIR / "locks"
+VERDICT_MODEL_FILE = DATA_DIR / "verdict_model.json"
+DEFAULT_WEIGHTS = {"financials": 0.4, "founders": 0.3, "social": 0.3}
+DEFAULT_THRESHOLDS = {"invest": 76, "observe": 56}
+
+store = ResultStore(DB_FILE)
+singleflight = SingleFlight(LOCKS_DIR)
+_storage_ready = False
+_storage_lock = threading.Lock()
 
 
 def ensure_storage() -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not RESULTS_FILE.exists():
-        RESULTS_FILE.write_text("[]", encoding="utf-8")
-    if not WATCHLIST_FILE.exists():
-        WATCHLIST_FILE.write_text("[]", encoding="utf-8")
-    if not SETTINGS_FILE.exists():
-        SETTINGS_FILE.write_text(
-            json.dumps(
-                {
-                    "demo_mode": False,
-                    "coingecko_api_key": "",
-                    "reddit_client_id": "",
-                    "reddit_client_secret": "",
-                    "reddit_user_agent": "InvestAI/1.0",
-                    "telegram_bot_token": "",
-                    "telegram_chat_id": "",
-                },
-                indent=2,
-            ),
-            encoding="utf-8",
-        )
+    # Runs its filesystem and schema work once per process; afterwards it is a flag check.
+    global _storage_ready
+    if _storage_ready:
+        return
+    with _storage_lock:
+        if _storage_ready:
+            return
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        store.init()
+        store.migrate_legacy(RESULTS_FILE, WATCHLIST_FILE)
+        store.backfill_series()
+        settings_store.ensure()
+        _storage_ready = True
 
 
 def _read_json(path: Path, default):
@@ -49,52 +55,67 @@ def _read_json(path: Path, default):
         return default
 
 
-def _write_json(path: Path, obj) -> None:
-    path.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+def load_verdict_model(path: Path = VERDICT_MODEL_FILE) -> Dict[str, Any]:
+    # Written by backtest.py --save; anything missing or malformed keeps the defaults.
+    model = _read_json(path, {}) if path.exists() else {}
+    out = {"weights": dict(DEFAULT_WEIGHTS), "thresholds": dict(DEFAULT_THRESHOLDS), "source": "default"}
+    try:
+        weights = {k: float(model["weights"][k]) for k in DEFAULT_WEIGHTS}
+        invest, observe = int(model["thresholds"]["invest"]), int(model["thresholds"]["observe"])
+    except Exception:
+        return out
+    if min(weights.values()) < 0 or abs(sum(weights.values()) - 1.0) > 1e-3 or not 0 <= observe < invest <= 100:
+        return out
+    return {"weights": weights, "thresholds": {"invest": invest, "observe": observe}, "source": "backtest"}
+
+
+verdict_model = load_verdict_model()
 
 
 def load_settings() -> Dict[str, Any]:
-    ensure_storage()
-    return _read_json(SETTINGS_FILE, {})
+    return settings_store.as_dict()
 
 
 def save_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
-    ensure_storage()
-    current = load_settings()
-    current.update(settings or {})
-    _write_json(SETTINGS_FILE, current)
-    return current
+    # Raises ValueError on an invalid field; nothing is written in that case.
+    return settings_store.save(settings).to_dict()
 
 
 def load_results() -> List[Dict[str, Any]]:
     ensure_storage()
-    return _read_json(RESULTS_FILE, [])
+    return store.latest()
+
+
+def load_result(entity: str) -> Optional[Dict[str, Any]]:
+    ensure_storage()
+    return store.get(entity)
+
+
+def load_result_times(entities: Iterable[str]) -> Dict[str, str]:
+    ensure_storage()
+    return store.timestamps(list(entities))
 
 
 def save_result(item: Dict[str, Any]) -> None:
-    rows = load_results()
-    rows = [r for r in rows if str(r.get("entity", "")).lower() != str(item.get("entity", "")).lower()]
-    rows.insert(0, item)
-    _write_json(RESULTS_FILE, rows[:250])
+    ensure_storage()
+    store.save(item)
 
 
 def load_watchlist() -> List[str]:
     ensure_storage()
-    arr = _read_json(WATCHLIST_FILE, [])
-    return [str(x) for x in arr]
+    return store.watchlist()
 
 
 def add_watchlist(entity: str) -> List[str]:
-    items = [x for x in load_watchlist() if x.lower() != entity.lower()]
-    items.insert(0, entity)
-    _write_json(WATCHLIST_FILE, items[:200])
-    return items
+    ensure_storage()
+    return store.add_watchlist(entity)
 
 
-def _verdict(score: int) -> str:
-    if score >= 76:
+def _verdict(score: int, thresholds: Optional[Dict[str, int]] = None) -> str:
+    thresholds = thresholds or verdict_model["thresholds"]
+    if score >= thresholds["invest"]:
         return "INVESTIR"
-    if score >= 56:
+    if score >= thresholds["observe"]:
         return "OBSERVER"
     return "FUIR"
 
@@ -107,24 +128,31 @@ def _reason(fin: Dict[str, Any], founders: Dict[str, Any], social: Dict[str, Any
     )
 
 
-async def run_research(entity: str, demo_mode: bool = False, settings: Dict[str, Any] | None = None) -> Dict[str, Any]:
-    settings = settings or load_settings()
-    demo = bool(demo_mode or settings.get("demo_mode"))
-    reddit_cfg = {
+def _reddit_config(settings: Dict[str, Any]) -> Dict[str, str]:
+    return {
         "client_id": settings.get("reddit_client_id", ""),
         "client_secret": settings.get("reddit_client_secret", ""),
         "user_agent": settings.get("reddit_user_agent", "InvestAI/1.0"),
     }
 
-    loop = asyncio.get_running_loop()
-    fin_f = loop.run_in_executor(None, lambda: analyze_financials(entity, demo))
-    founder_f = loop.run_in_executor(None, lambda: check_founders(entity, demo))
-    social_f = loop.run_in_executor(None, lambda: get_social_sentiment(entity, demo, reddit_cfg))
-    financials, founders, social = await asyncio.gather(fin_f, founder_f, social_f)
 
-    final_score = int(round(financials["score"] * 0.4 + founders["score"] * 0.3 + social["score"] * 0.3))
+def _compose_result(
+    entity: str,
+    demo: bool,
+    financials: Dict[str, Any],
+    founders: Dict[str, Any],
+    social: Dict[str, Any],
+) -> Dict[str, Any]:
+    weights = verdict_model["weights"]
+    final_score = int(
+        round(
+            financials["score"] * weights["financials"]
+            + founders["score"] * weights["founders"]
+            + social["score"] * weights["social"]
+        )
+    )
     verdict = _verdict(final_score)
-    result = {
+    return {
         "entity": entity,
         "score": max(0, min(100, final_score)),
         "verdict": verdict,
@@ -132,10 +160,146 @@ async def run_research(entity: str, demo_mode: bool = False, settings: Dict[str,
         "financials": financials,
         "founders": founders,
         "social": social,
-        "weights": {"financials": 0.4, "founders": 0.3, "social": 0.3},
+        "weights": dict(weights),
+        # Components that fell back to the hash model because an upstream budget was exhausted.
+        "degraded": {name: part["degraded"] for name, part in (("financials", financials), ("social", social)) if part.get("degraded")},
         "mode": "demo" if demo else "real",
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
-    save_result(result)
+
+
+async def _stage(name: str, coro: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    with span("stage", stage=name) as sp:
+        value = await coro
+        if value.get("source") == "fallback":
+            sp.outcome = "fallback"
+        return value
+
+
+ComponentCallback = Callable[[str, Dict[str, Any]], None]
+
+
+async def run_research(
+    entity: str,
+    demo_mode: bool = False,
+    settings: Dict[str, Any] | None = None,
+    on_component: Optional[ComponentCallback] = None,
+) -> Dict[str, Any]:
+    settings = settings or load_settings()
+    demo = bool(demo_mode or settings.get("demo_mode"))
+    reddit_cfg = _reddit_config(settings)
+
+    def emit(name: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        if on_component is not None:
+            on_component(name, value)
+        return value
+
+    async def component(name: str, coro: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        return emit(name, await _stage(name, coro))
+
+    with span("stage", stage="founders"):
+        founders = check_founders(entity, demo)
+    emit("founders", founders)
+    financials, social = await asyncio.gather(
+        component("financials", analyze_financials_async(entity, demo)),
+        component("social", get_social_sentiment_async(entity, demo, reddit_cfg)),
+    )
+
+    with span("stage", stage="scoring"):
+        result = _compose_result(entity, demo, financials, founders, social)
+    with span("stage", stage="save_result"):
+        await asyncio.to_thread(save_result, result)
+    return result
+
+
+async def run_component(
+    name: str,
+    entity: str,
+    demo_mode: bool = False,
+    settings: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    # One engine on its own: same provider cache and chains as run_research, but no scoring, saving or alerts.
+    settings = settings or load_settings()
+    demo = bool(demo_mode or settings.get("demo_mode"))
+    if name == "founders":
+        with span("stage", stage="founders"):
+            return check_founders(entity, demo)
+    if name == "financials":
+        return await _stage(name, analyze_financials_async(entity, demo))
+    if name == "social":
+        return await _stage(name, get_social_sentiment_async(entity, demo, _reddit_config(settings)))
+    raise ValueError(f"Unknown component: {name}")
+
+
+async def run_research_coalesced(
+    entity: str,
+    demo_mode: bool = False,
+    settings: Dict[str, Any] | None = None,
+    on_component: Optional[ComponentCallback] = None,
+) -> Dict[str, Any]:
+    settings = settings or load_settings()
+    demo = bool(demo_mode or settings.get("demo_mode"))
+    mode = "demo" if demo else "real"
+
+    async def reuse(since: float) -> Dict[str, Any] | None:
+        row = await asyncio.to_thread(store.get, entity)
+        if not row or row.get("mode") != mode:
+            return None
+        try:
+            saved_at = datetime.fromisoformat(str(row.get("timestamp"))).timestamp()
+        except ValueError:
+            return None
+        return row if saved_at >= since else None
+
+    key = (" ".join(entity.split()).lower(), demo)
+    result, coalesced = await singleflight.do(key, lambda: run_research(entity, demo, settings, on_component), reuse)
+    result = dict(result)
+    result["coalesced"] = coalesced is not None
+    # Followers never saw the leader's components stream by, so replay them from the shared result.
+    if coalesced is not None and on_component is not None:
+        for name in ("founders", "financials", "social"):
+            on_component(name, result[name])
     return result
 
+
+def _unique_entities(entities: Iterable[str]) -> List[str]:
+    seen = set()
+    out: List[str] = []
+    for raw in entities:
+        entity = str(raw or "").strip()
+        if entity and entity.lower() not in seen:
+            seen.add(entity.lower())
+            out.append(entity)
+    return out
+
+
+async def run_research_batch(
+    entities: Iterable[str],
+    demo_mode: bool = False,
+    settings: Dict[str, Any] | None = None,
+    concurrency: int = 8,
+) -> List[Dict[str, Any]]:
+    settings = settings or load_settings()
+    demo = bool(demo_mode or settings.get("demo_mode"))
+    reddit_cfg = _reddit_config(settings)
+    names = _unique_entities(entities)
+    if not names:
+        return []
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def per_entity(entity: str):
+        async with sem:
+            return check_founders(entity, demo), await get_social_sentiment_async(entity, demo, reddit_cfg)
+
+    # Batches queue behind interactive requests for upstream budget.
+    with lane("background"):
+        per_entity_results, financials = await asyncio.gather(
+            asyncio.gather(*(per_entity(e) for e in names)),
+            analyze_financials_batch_async(names, demo),
+        )
+    results: List[Dict[str, Any]] = []
+    for entity, (founders, social) in zip(names, per_entity_results):
+        results.append(_compose_result(entity, demo, financials[entity], founders, social))
+    await asyncio.to_thread(lambda: [save_result(r) for r in results])
+    return results
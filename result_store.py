@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from sqlite_local import ThreadLocalDB
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity_key TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_entity_ts ON results(entity_key, ts);
+CREATE TABLE IF NOT EXISTS latest (
+    entity_key TEXT PRIMARY KEY,
+    entity TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    score INTEGER,
+    verdict TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_latest_ts ON latest(ts);
+CREATE INDEX IF NOT EXISTS idx_latest_score ON latest(score);
+CREATE INDEX IF NOT EXISTS idx_latest_verdict ON latest(verdict);
+CREATE TABLE IF NOT EXISTS watchlist (
+    entity_key TEXT PRIMARY KEY,
+    entity TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_watchlist_added ON watchlist(added_at);
+CREATE TABLE IF NOT EXISTS series (
+    entity_key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    demo INTEGER NOT NULL DEFAULT 0,
+    score REAL,
+    financials REAL,
+    founders REAL,
+    social REAL,
+    price REAL,
+    market_cap REAL,
+    bullish_ratio REAL,
+    PRIMARY KEY (entity_key, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+WATCHLIST_LIMIT = 200
+SERIES_INSERT = (
+    "INSERT OR REPLACE INTO series (entity_key, ts, demo, score, financials, founders, social, price, market_cap, "
+    "bullish_ratio) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SERIES_COLUMNS = ("score", "financials", "founders", "social", "price", "market_cap", "bullish_ratio")
+SORT_COLUMNS = {"timestamp": "ts", "score": "score", "entity": "entity_key", "verdict": "verdict"}
+
+
+def entity_key(entity: Any) -> str:
+    return str(entity or "").strip().lower()
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _epoch(ts: Any) -> float:
+    try:
+        return datetime.fromisoformat(str(ts)).timestamp()
+    except Exception:
+        return 0.0
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def series_row(item: Dict[str, Any]) -> Tuple[Any, ...]:
+    fin = item.get("financials") or {}
+    founders = item.get("founders") or {}
+    social = item.get("social") or {}
+    return (
+        entity_key(item.get("entity")),
+        _epoch(item.get("timestamp")),
+        1 if item.get("mode") == "demo" else 0,
+        _number(item.get("score")),
+        _number(fin.get("score")),
+        _number(founders.get("score")),
+        _number(social.get("score")),
+        _number(fin.get("price")),
+        _number(fin.get("market_cap")),
+        _number(social.get("bullish_ratio")),
+    )
+
+
+class ResultStore:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.db = ThreadLocalDB(self.path, SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.conn
+
+    def init(self) -> None:
+        self.db.init()
+
+    def transaction(self) -> ContextManager[sqlite3.Connection]:
+        return self.db.transaction()
+
+    def _upsert(self, conn: sqlite3.Connection, item: Dict[str, Any]) -> None:
+        key = entity_key(item.get("entity"))
+        ts = str(item.get("timestamp") or "")
+        payload = _dumps(item)
+        conn.execute(
+            "INSERT INTO results (entity_key, entity, ts, payload) VALUES (?, ?, ?, ?)",
+            (key, str(item.get("entity") or ""), ts, payload),
+        )
+        conn.execute(
+            """
+            INSERT INTO latest (entity_key, entity, ts, score, verdict, payload)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(entity_key) DO UPDATE SET
+                entity = excluded.entity,
+                ts = excluded.ts,
+                score = excluded.score,
+                verdict = excluded.verdict,
+                payload = excluded.payload
+            WHERE excluded.ts >= latest.ts
+            """,
+            (key, str(item.get("entity") or ""), ts, item.get("score"), item.get("verdict"), payload),
+        )
+        conn.execute(SERIES_INSERT, series_row(item))
+
+    def save(self, item: Dict[str, Any]) -> None:
+        with self.transaction() as conn:
+            self._upsert(conn, item)
+
+    def latest(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT payload FROM latest ORDER BY ts DESC").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def state(self) -> Tuple[int, str]:
+        count, newest = self.conn.execute("SELECT COUNT(*), MAX(ts) FROM latest").fetchone()
+        return int(count), str(newest or "")
+
+    def query(
+        self,
+        verdicts: Sequence[str] = (),
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        sort: str = "timestamp",
+        descending: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        where: List[str] = []
+        params: List[Any] = []
+        if verdicts:
+            where.append(f"verdict IN ({','.join('?' * len(verdicts))})")
+            params.extend(v.upper() for v in verdicts)
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("score <= ?")
+            params.append(max_score)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        total = self.conn.execute(f"SELECT COUNT(*) FROM latest{clause}", params).fetchone()[0]
+        column = SORT_COLUMNS.get(sort, "ts")
+        direction = "DESC" if descending else "ASC"
+        sql = f"SELECT payload FROM latest{clause} ORDER BY {column} {direction}, entity_key LIMIT ? OFFSET ?"
+        rows = self.conn.execute(sql, [*params, -1 if limit is None else int(limit), max(0, int(offset))]).fetchall()
+        return [json.loads(r[0]) for r in rows], int(total)
+
+    def get(self, entity: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT payload FROM latest WHERE entity_key = ?", (entity_key(entity),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def timestamps(self, entities: Sequence[str]) -> Dict[str, str]:
+        # Latest result time per entity key without loading any payloads.
+        keys = sorted({entity_key(e) for e in entities if entity_key(e)})
+        if not keys:
+            return {}
+        rows = self.conn.execute(
+            f"SELECT entity_key, ts FROM latest WHERE entity_key IN ({','.join('?' * len(keys))})", keys
+        ).fetchall()
+        return {r[0]: r[1] for r in rows}
+
+    def history(self, entity: str, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT payload FROM results WHERE entity_key = ? ORDER BY ts DESC LIMIT ?",
+            (entity_key(entity), int(limit)),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def series(
+        self,
+        entities: Sequence[str],
+        since: float = 0.0,
+        until: Optional[float] = None,
+        include_demo: bool = True,
+        mode: Optional[str] = None,
+    ) -> List[Tuple[Any, ...]]:
+        # Plain tuples ordered by (entity_key, ts): the primary key order, so callers can split without sorting.
+        keys = sorted({entity_key(e) for e in entities if entity_key(e)})
+        if not keys:
+            return []
+        sql = (
+            f"SELECT entity_key, ts, {', '.join(SERIES_COLUMNS)} FROM series "
+            f"WHERE entity_key IN ({','.join('?' * len(keys))}) AND ts >= ? AND ts <= ?"
+        )
+        params: List[Any] = [*keys, float(since), float("inf") if until is None else float(until)]
+        if mode is not None:
+            # Demo rows are synthetic; a series only ever mixes results of one mode.
+            sql += " AND demo = 1" if mode == "demo" else " AND demo = 0"
+        elif not include_demo:
+            sql += " AND demo = 0"
+        return self.conn.execute(sql + " ORDER BY entity_key, ts", params).fetchall()
+
+    def backfill_series(self, batch: int = 500) -> int:
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'series_backfilled'").fetchone():
+                return 0
+            count = 0
+            cursor = conn.execute("SELECT payload FROM results ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    break
+                conn.executemany(SERIES_INSERT, [series_row(json.loads(r[0])) for r in rows])
+                count += len(rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('series_backfilled', ?)", (str(time.time()),))
+        return count
+
+    def watchlist(self) -> List[str]:
+        rows = self.conn.execute("SELECT entity FROM watchlist ORDER BY added_at DESC").fetchall()
+        return [r[0] for r in rows]
+
+    def add_watchlist(self, entity: str) -> List[str]:
+        with self.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO watchlist (entity_key, entity, added_at) VALUES (?, ?, ?)
+                ON CONFLICT(entity_key) DO UPDATE SET entity = excluded.entity, added_at = excluded.added_at
+                """,
+                (entity_key(entity), entity, time.time()),
+            )
+            conn.execute(
+                """
+                DELETE FROM watchlist WHERE entity_key NOT IN (
+                    SELECT entity_key FROM watchlist ORDER BY added_at DESC LIMIT ?
+                )
+                """,
+                (WATCHLIST_LIMIT,),
+            )
+        return self.watchlist()
+
+    def migrate_legacy(self, results_file: Path, watchlist_file: Path) -> bool:
+        with self.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+                return False
+            rows = _read_legacy(results_file)
+            # Legacy files are newest-first; insert oldest-first so history ids follow time.
+            for item in reversed(rows):
+                if isinstance(item, dict) and item.get("entity"):
+                    self._upsert(conn, item)
+            items = _read_legacy(watchlist_file)
+            now = time.time()
+            for offset, entity in enumerate(items):
+                name = str(entity or "").strip()
+                if name:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO watchlist (entity_key, entity, added_at) VALUES (?, ?, ?)",
+                        (entity_key(name), name, now - offset),
+                    )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)", (str(now),))
+        return True
+
+
+def _read_legacy(path: Path) -> List[Any]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return []
+    return data if isinstance(data, list) else []
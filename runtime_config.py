@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+APP_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(os.getenv("INVESTAI_DATA_DIR") or APP_DIR / "data")
+
+# Upstream base URLs; overridable so benchmarks and tests can point them at a local stub.
+COINGECKO_API = os.getenv("INVESTAI_COINGECKO_URL", "https://api.coingecko.com/api/v3").rstrip("/")
+REDDIT_API = os.getenv("INVESTAI_REDDIT_URL", "https://www.reddit.com").rstrip("/")
+TELEGRAM_API = os.getenv("INVESTAI_TELEGRAM_URL", "https://api.telegram.org").rstrip("/")
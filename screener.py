@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+# Screening runs are offline batch jobs; keep them out of the server's Prometheus snapshots.
+os.environ.setdefault("INVESTAI_METRICS", "0")
+# Screens are bulk work: they only use upstream budget that interactive requests leave free.
+os.environ.setdefault("INVESTAI_LANE", "background")
+
+from financial_analyzer import analyze_financials  # noqa: E402
+from founder_checker import check_founders  # noqa: E402
+from research_engine import _compose_result, _reddit_config, _unique_entities, load_settings  # noqa: E402
+from result_store import entity_key  # noqa: E402
+from sentiment_engine import get_social_sentiment  # noqa: E402
+
+
+DEFAULT_LIMITS = {"financials": 8, "social": 4}
+CHUNK_SIZE = 25
+
+_limits: Dict[str, Any] = {}
+
+
+def read_universe(path: Path) -> List[str]:
+    names: List[str] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            names.append(line.split(",", 1)[0].strip())
+    return _unique_entities(names)
+
+
+def _init_worker(limits: Dict[str, Any]) -> None:
+    _limits.update(limits)
+
+
+@contextmanager
+def _slot(provider: str) -> Iterator[None]:
+    # Semaphores are shared by every worker process, so the bound holds for the whole run.
+    sem = _limits.get(provider)
+    if sem is None:
+        yield
+        return
+    with sem:
+        yield
+
+
+def screen_entity(entity: str, demo: bool, reddit_cfg: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        founders = check_founders(entity, demo)
+        with _slot("financials"):
+            financials = analyze_financials(entity, demo)
+        with _slot("social"):
+            social = get_social_sentiment(entity, demo, reddit_cfg)
+        return _compose_result(entity, demo, financials, founders, social)
+    except Exception as exc:
+        return {"entity": entity, "error": str(exc)}
+
+
+def screen_chunk(args: Tuple[List[str], bool, Dict[str, str], int]) -> List[Dict[str, Any]]:
+    entities, demo, reddit_cfg, threads = args
+    with ThreadPoolExecutor(max_workers=max(1, min(threads, len(entities)))) as pool:
+        return list(pool.map(lambda e: screen_entity(e, demo, reddit_cfg), entities))
+
+
+class Checkpoint:
+    def __init__(self, output: Path, universe_hash: str, demo: bool) -> None:
+        self.output = output
+        self.path = output.with_name(output.name + ".ckpt")
+        self.universe_hash = universe_hash
+        self.demo = demo
+        self.offset = 0
+        self.done = 0
+
+    def resume(self) -> Set[str]:
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            state = {}
+        if state.get("universe") != self.universe_hash or state.get("demo") != self.demo:
+            # A different universe or mode starts over rather than mixing results.
+            self.output.write_text("", encoding="utf-8")
+            self.offset, self.done = 0, 0
+            self._write()
+            return set()
+        self.offset, self.done = int(state.get("offset") or 0), int(state.get("done") or 0)
+        # Anything written after the last checkpoint may be partial; it will be recomputed.
+        with open(self.output, "a+b") as fh:
+            # min(): a crash between the error-row rewrite below and its checkpoint leaves a stale, larger offset.
+            fh.truncate(min(self.offset, fh.seek(0, os.SEEK_END)))
+        # One row per entity: error rows are dropped here and their entities retried, so a retry replaces
+        # the failed attempt's row instead of adding a second one next to it.
+        kept: Dict[str, str] = {}
+        rows = 0
+        with open(self.output, "r", encoding="utf-8") as fh:
+            for line in fh:
+                row = json.loads(line)
+                key = entity_key(row.get("entity"))
+                rows += 1
+                kept.pop(key, None)
+                if "error" not in row:
+                    kept[key] = line if line.endswith("\n") else line + "\n"
+        if len(kept) != rows:
+            tmp = self.output.with_name(self.output.name + ".tmp")
+            tmp.write_text("".join(kept.values()), encoding="utf-8")
+            os.replace(tmp, self.output)
+        self.offset, self.done = self.output.stat().st_size, len(kept)
+        self._write()
+        return set(kept)
+
+    def _write(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        state = {
+            "universe": self.universe_hash,
+            "demo": self.demo,
+            "offset": self.offset,
+            "done": self.done,
+            "updated_at": time.time(),
+        }
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def commit(self, fh, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+        self.offset = fh.tell()
+        self.done += len(rows)
+        self._write()
+
+
+def _parse_limits(values: Sequence[str]) -> Dict[str, int]:
+    limits = dict(DEFAULT_LIMITS)
+    for value in values:
+        name, _, count = value.partition("=")
+        limits[name.strip()] = max(1, int(count))
+    return limits
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Screen a universe of tickers/coins and stream results as NDJSON.")
+    parser.add_argument("universe", type=Path, help="one entity per line (# comments, CSV first column)")
+    parser.add_argument("-o", "--output", type=Path, default=Path("screen.ndjson"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="entities in flight per worker")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="entities per checkpoint unit")
+    parser.add_argument(
+        "--limit",
+        action="append",
+        default=[],
+        metavar="PROVIDER=N",
+        help="max concurrent calls across all workers (financials, social)",
+    )
+    parser.add_argument("--demo", action="store_true", help="offline run with demo data (throughput benchmark)")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    universe = read_universe(args.universe)
+    universe_hash = hashlib.sha1("\n".join(universe).encode("utf-8")).hexdigest()
+    settings = load_settings()
+    demo = bool(args.demo)
+    reddit_cfg = _reddit_config(settings)
+
+    checkpoint = Checkpoint(args.output, universe_hash, demo)
+    if args.fresh:
+        args.output.unlink(missing_ok=True)
+        checkpoint.path.unlink(missing_ok=True)
+    args.output.touch()
+    finished = checkpoint.resume()
+    todo = [e for e in universe if entity_key(e) not in finished]
+    chunks = [todo[i : i + args.chunk] for i in range(0, len(todo), max(1, args.chunk))]
+    print(f"universe={len(universe)} done={len(finished)} todo={len(todo)} workers={args.workers}", file=sys.stderr)
+
+    limits = {name: mp.BoundedSemaphore(n) for name, n in _parse_limits(args.limit).items()}
+    started = time.perf_counter()
+    processed = errors = 0
+    with open(args.output, "a", encoding="utf-8") as fh, mp.Pool(
+        max(1, args.workers), initializer=_init_worker, initargs=(limits,)
+    ) as pool:
+        work = ((chunk, demo, reddit_cfg, args.threads) for chunk in chunks)
+        for rows in pool.imap_unordered(screen_chunk, work):
+            checkpoint.commit(fh, rows)
+            processed += len(rows)
+            errors += sum(1 for r in rows if "error" in r)
+    elapsed = time.perf_counter() - started
+    summary = {
+        "processed": processed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "entities_per_second": round(processed / elapsed, 2) if elapsed else None,
+        "demo": demo,
+        "output": str(args.output),
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if errors and errors == processed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
-import requests
-
-try:
-    import praw
-except Exception:  # pragma: no cover - optional dependency
-    praw = None
+from async_runtime import http_client, run_sync
+from fixtures import fixture, replaying
+from provider_chain import provider_step, run_chain, throttled
+from providers import registry
+from reddit_posts import client_pool, post_store
+from runtime_config import REDDIT_API
 
 
 def _seed(entity: str) -> int:
@@ -28,72 +29,90 @@ def _label_from_ratio(ratio: float) -> str:
     return "VERY BEARISH"
 
 
-def _public_reddit_sentiment(entity: str) -> Dict[str, Any] | None:
+def _post(d: Any) -> Dict[str, Any]:
+    get = d.get if isinstance(d, dict) else lambda k: getattr(d, k, None)
+    return {
+        "id": str(get("id") or ""),
+        "created_utc": float(get("created_utc") or 0.0),
+        "score": int(get("score") or 0),
+        "title": str(get("title") or "").strip(),
+    }
+
+
+async def _public_reddit_posts(
+    entity: str, before: str | None = None, refresh: Sequence[str] = (), timeout: float = 12
+) -> List[Dict[str, Any]]:
     query = (entity or "").strip()
     if not query:
-        return None
+        return []
     headers = {"User-Agent": "InvestAI/1.0 (due-diligence)"}
-    try:
-        res = requests.get(
-            "https://www.reddit.com/search.json",
-            params={"q": query, "sort": "top", "limit": 15, "t": "month"},
-            headers=headers,
-            timeout=12,
-        )
+    params: Dict[str, Any] = {"q": query, "sort": "new", "limit": 100, "t": "month"}
+    if before:
+        params["before"] = before
+
+    async def get(path: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        res = await http_client().get(f"{REDDIT_API}{path}", params=query, headers=headers, timeout=timeout)
         res.raise_for_status()
-        posts = res.json().get("data", {}).get("children", [])
-        if not posts:
-            return None
-        values: List[int] = []
-        titles: List[str] = []
-        for p in posts:
-            d = p.get("data", {})
-            title = str(d.get("title") or "").strip()
-            score = int(d.get("score") or 0)
-            if title:
-                titles.append(title)
-                values.append(score)
-        if not values:
-            return None
-        positive = sum(1 for v in values if v > 20)
-        ratio = positive / max(1, len(values))
-        intensity = min(100, int((sum(values) / len(values)) / 8 + ratio * 40))
-        return {
-            "ratio": ratio,
-            "intensity": intensity,
-            "top_post": titles[0] if titles else "No significant thread",
-            "sample_size": len(values),
-            "source": "reddit-public",
-        }
-    except Exception:
+        return [_post(p.get("data", {})) for p in res.json().get("data", {}).get("children", [])]
+
+    calls = [get("/search.json", params)]
+    if refresh:
+        calls.append(get("/api/info.json", {"id": ",".join(refresh)}))
+    return [post for page in await asyncio.gather(*calls) for post in page]
+
+
+def _praw_posts(
+    entity: str, client_id: str, client_secret: str, user_agent: str, before: str | None, refresh: Sequence[str]
+) -> List[Dict[str, Any]]:
+    with client_pool.client(client_id, client_secret, user_agent) as reddit:
+        kwargs: Dict[str, Any] = {"sort": "new", "time_filter": "month", "limit": 100}
+        if before:
+            # praw merges into params, so it must be left out rather than passed as None.
+            kwargs["params"] = {"before": before}
+        posts = [_post(p) for p in reddit.subreddit("all").search(entity, **kwargs)]
+        if refresh:
+            posts.extend(_post(p) for p in reddit.info(fullnames=list(refresh)))
+        return posts
+
+
+async def _ingest(entity: str, source: str, fetch: Any) -> Dict[str, Any] | None:
+    # New posts come from a listing "before" the newest stored one, and the stalest stored posts are re-read
+    # by id in the same call, so scores keep moving after a post is first seen.
+    before, refresh = await asyncio.to_thread(post_store.plan, entity)
+    posts = await fetch(before, refresh)
+    added = await asyncio.to_thread(post_store.ingest, entity, posts, before is None, refresh)
+    res = await asyncio.to_thread(post_store.aggregate, entity)
+    if res is None:
         return None
+    return dict(res, source=source, new_posts=added)
 
 
-def _praw_sentiment(entity: str, client_id: str, client_secret: str, user_agent: str) -> Dict[str, Any] | None:
-    if praw is None or not client_id or not client_secret:
+# Fixtures record the aggregate, not the raw posts: a replay must not depend on, or write to, reddit.db.
+@fixture("reddit-public")
+async def _public_reddit_sentiment(entity: str, timeout: float = 12) -> Dict[str, Any] | None:
+    if not (entity or "").strip():
         return None
-    try:
-        reddit = praw.Reddit(client_id=client_id, client_secret=client_secret, user_agent=user_agent or "InvestAI/1.0")
-        posts = list(reddit.subreddit("all").search(entity, sort="relevance", time_filter="month", limit=20))
-        if not posts:
-            return None
-        values = [int(getattr(p, "score", 0) or 0) for p in posts]
-        top_post = posts[0].title if posts else "No significant thread"
-        positive = sum(1 for v in values if v > 20)
-        ratio = positive / max(1, len(values))
-        intensity = min(100, int((sum(values) / len(values)) / 8 + ratio * 40))
-        return {
-            "ratio": ratio,
-            "intensity": intensity,
-            "top_post": top_post,
-            "sample_size": len(values),
-            "source": "praw",
-        }
-    except Exception:
+    return await _ingest(
+        entity, "reddit-public", lambda before, refresh: _public_reddit_posts(entity, before, refresh, timeout)
+    )
+
+
+@fixture("praw")
+async def _praw_sentiment(entity: str, client_id: str, client_secret: str, user_agent: str) -> Dict[str, Any] | None:
+    if not (client_id and client_secret) or registry.get("praw") is None:
         return None
+    return await _ingest(
+        entity,
+        "praw",
+        lambda before, refresh: asyncio.to_thread(
+            _praw_posts, entity, client_id, client_secret, user_agent, before, refresh
+        ),
+    )
 
 
-def get_social_sentiment(entity: str, demo_mode: bool = False, reddit_config: Dict[str, str] | None = None) -> Dict[str, Any]:
+async def get_social_sentiment_async(
+    entity: str, demo_mode: bool = False, reddit_config: Dict[str, str] | None = None
+) -> Dict[str, Any]:
     if not entity:
         raise ValueError("entity is required")
 
@@ -112,15 +131,27 @@ def get_social_sentiment(entity: str, demo_mode: bool = False, reddit_config: Di
         }
 
     reddit_config = reddit_config or {}
-    res = _praw_sentiment(
-        entity,
-        reddit_config.get("client_id", ""),
-        reddit_config.get("client_secret", ""),
-        reddit_config.get("user_agent", ""),
-    )
-    if res is None:
-        res = _public_reddit_sentiment(entity)
+    cache_meta: Dict[str, Any] = {}
+    steps = []
+    if (replaying() or registry.available("praw")) and reddit_config.get("client_id") and reddit_config.get("client_secret"):
+        steps.append(
+            provider_step(
+                "praw",
+                entity,
+                lambda t: _praw_sentiment(
+                    entity,
+                    reddit_config.get("client_id", ""),
+                    reddit_config.get("client_secret", ""),
+                    reddit_config.get("user_agent", ""),
+                ),
+                cache_meta,
+            )
+        )
+    steps.append(provider_step("reddit-public", entity, lambda t: _public_reddit_sentiment(entity, t), cache_meta))
+    res, _ = await run_chain(steps)
+    degraded = None
     if res is None:
+        degraded = "throttled" if throttled(cache_meta) else None
         seed = _seed(f"fallback:{entity}")
         ratio = 0.35 + ((seed % 42) / 100.0)
         intensity = 48 + (seed % 29)
@@ -142,5 +173,11 @@ def get_social_sentiment(entity: str, demo_mode: bool = False, reddit_config: Di
         "top_post": res["top_post"],
         "sample_size": int(res["sample_size"]),
         "source": res["source"],
+        "new_posts": int(res.get("new_posts") or 0),
+        "cache": cache_meta,
+        "degraded": degraded,
     }
 
+
+def get_social_sentiment(entity: str, demo_mode: bool = False, reddit_config: Dict[str, str] | None = None) -> Dict[str, Any]:
+    return run_sync(get_social_sentiment_async(entity, demo_mode, reddit_config))
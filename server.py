@@ -1,62 +1,235 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import gzip
+import hashlib
+import json
+import math
 import os
+import queue
+import subprocess
+import sys
+import time
 from pathlib import Path
-from typing import Any, Dict
-
-from flask import Flask, jsonify, request, send_from_directory
-
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+
+from alert_rules import AlertEngine, parse_rules
+from async_runtime import run_sync, submit
+from coin_index import coin_index
+from fixtures import MODE as FIXTURE_MODE, archive as fixture_archive
+from metrics import collect_timings, observe, process_age, render_prometheus, rss_mb, span
+from provider_cache import cache_stats
+from provider_chain import breaker_stats
+from providers import registry
+from rate_limiter import rate_limiter
+from reddit_posts import client_pool, post_store
 from research_engine import (
+    DATA_DIR,
     add_watchlist,
     ensure_storage,
-    load_results,
+    load_result,
     load_settings,
     load_watchlist,
-    run_research,
+    ComponentCallback,
+    run_component,
+    run_research_batch,
+    run_research_coalesced,
+    singleflight,
+    store,
+    verdict_model,
     save_settings,
 )
+from shared_cache import shared_cache
+from static_assets import IMMUTABLE, static_assets
 from telegram_alerts import InvestTelegramAlerts
+from telegram_outbox import TelegramOutbox
+from watchlist_scheduler import WatchlistScheduler
 
 
 APP_DIR = Path(__file__).resolve().parent
 PORT = int(os.getenv("PORT", "5001"))
+BATCH_MAX_ENTITIES = int(os.getenv("INVESTAI_BATCH_MAX", "500"))
+BATCH_CONCURRENCY = int(os.getenv("INVESTAI_BATCH_CONCURRENCY", "8"))
+SSE_HEARTBEAT_SECONDS = 15.0
+SCHEDULER_ENABLED = os.getenv("INVESTAI_SCHEDULER", "1").lower() not in {"0", "false", "no", "off"}
+OUTBOX_ENABLED = os.getenv("INVESTAI_OUTBOX", "1").lower() not in {"0", "false", "no", "off"}
+GZIP_JSON = os.getenv("INVESTAI_GZIP_JSON", "1").lower() not in {"0", "false", "no", "off"}
+GZIP_MIN_BYTES = int(os.getenv("INVESTAI_GZIP_MIN_BYTES", "1024"))
+
+# No static folder: only the pages and fingerprinted assets below are served, never the app directory itself.
+app = Flask(__name__, static_folder=None)
+# Schema, legacy migration and the settings file are set up here, once, instead of probed per request.
+ensure_storage()
+static_assets.build()
+alert_engine = AlertEngine(store)
+scheduler = WatchlistScheduler(on_results=lambda results, settings: _queue_alerts(results, settings))
+if SCHEDULER_ENABLED:
+    scheduler.start()
+outbox = TelegramOutbox(store, DATA_DIR / "outbox.lock")
+if OUTBOX_ENABLED:
+    outbox.start()
+
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
 
-app = Flask(__name__, static_folder=str(APP_DIR), static_url_path="")
+@app.after_request
+def record_request(resp):
+    started = g.pop("started", None)
+    if started is not None and request.url_rule is not None and request.path.startswith("/api/"):
+        observe("http", time.perf_counter() - started, route=request.url_rule.rule, status=str(resp.status_code))
+    return resp
+
+
+@app.after_request
+def compress_json(resp):
+    # Large JSON (portfolio, history, batch) is gzipped on the fly; small bodies are not worth the CPU.
+    if (
+        not GZIP_JSON
+        or resp.status_code != 200
+        or resp.mimetype != "application/json"
+        or resp.direct_passthrough
+        or resp.is_streamed
+        or "Content-Encoding" in resp.headers
+        or "gzip" not in (request.headers.get("Accept-Encoding") or "").lower()
+    ):
+        return resp
+    body = resp.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return resp
+    resp.set_data(gzip.compress(body, compresslevel=5))
+    resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    tag, weak = resp.get_etag()
+    if tag and not weak:
+        # The compressed bytes differ from the identity ones, so the validator becomes weak.
+        resp.set_etag(tag, weak=True)
+    return resp
 
 
 @app.after_request
 def add_cors_headers(resp):
     resp.headers["Access-Control-Allow-Origin"] = "*"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match"
+    resp.headers["Access-Control-Expose-Headers"] = "ETag"
     resp.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS"
     return resp
 
 
+def _static(name: str, cache_control: str) -> Response:
+    found = static_assets.lookup(name, request.headers.get("Accept-Encoding", ""))
+    if found is None:
+        return jsonify({"error": "Not found"}), 404
+    content_type, tag, encoding, body = found
+    if request.if_none_match.contains_weak(tag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, content_type=content_type)
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(tag)
+    resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+@app.route("/static/<path:name>", methods=["GET"])
+def static_asset(name: str):
+    # Fingerprinted names only: the content behind a name never changes, so browsers keep it for a year.
+    if name not in static_assets.manifest.values():
+        return jsonify({"error": "Not found"}), 404
+    return _static(name, IMMUTABLE)
+
+
 @app.route("/", methods=["GET"])
+@app.route("/index.html", methods=["GET"])
 def root():
-    return send_from_directory(APP_DIR, "index.html")
+    return _static("index.html", "no-cache")
 
 
 @app.route("/dashboard", methods=["GET"])
+@app.route("/dashboard.html", methods=["GET"])
 def dashboard_page():
-    return send_from_directory(APP_DIR, "dashboard.html")
+    return _static("dashboard.html", "no-cache")
 
 
 @app.route("/report", methods=["GET"])
+@app.route("/report.html", methods=["GET"])
 def report_page():
-    return send_from_directory(APP_DIR, "report.html")
+    return _static("report.html", "no-cache")
 
 
 @app.route("/settings", methods=["GET"])
+@app.route("/settings.html", methods=["GET"])
 def settings_page():
-    return send_from_directory(APP_DIR, "settings.html")
+    return _static("settings.html", "no-cache")
 
 
 @app.route("/api/health", methods=["GET"])
 def health():
-    ensure_storage()
-    return jsonify({"ok": True, "app": "invest_ai_node"})
+    return jsonify(
+        {
+            "ok": True,
+            "app": "invest_ai_node",
+            "cache": cache_stats(),
+            "shared_cache": shared_cache.stats() if shared_cache is not None else {"enabled": False},
+            "coin_index": coin_index.stats(),
+            "breakers": breaker_stats(),
+            "rate_limits": rate_limiter.stats(),
+            "singleflight": singleflight.stats,
+            "verdict_model": verdict_model,
+            "fixtures": fixture_archive.stats() if FIXTURE_MODE != "off" else {"mode": FIXTURE_MODE},
+            "telegram_outbox": outbox.stats(),
+            "alerts": alert_engine.stats(),
+            "reddit": dict(post_store.stats(), clients=client_pool.stats()),
+            "static": static_assets.stats(),
+            "startup": dict(STARTUP, rss_mb_now=rss_mb(), providers=registry.stats()),
+        }
+    )
+
+
+def _demo_mode(value: Any, settings: Dict[str, Any]) -> bool:
+    # Clients may omit demo_mode; the saved setting applies then, so no settings round-trip is needed first.
+    if value is None or value == "":
+        return bool(settings.get("demo_mode"))
+    return str(value).lower() in {"1", "true", "yes", "on"}
+
+
+def _queue_alerts(results: List[Dict[str, Any]], settings: Dict[str, Any]) -> bool:
+    # Every result moves the rules' per-entity state forward; only results that match a rule reach Telegram.
+    notifier = InvestTelegramAlerts(
+        bot_token=settings.get("telegram_bot_token", ""),
+        chat_id=settings.get("telegram_chat_id", ""),
+    )
+    rules = parse_rules(settings.get("alert_rules"))
+    queued = False
+    for result in results:
+        reasons = alert_engine.evaluate(result, rules, deliver=notifier.active)
+        if reasons and notifier.active:
+            outbox.enqueue(result, notifier.bot_token, notifier.chat_id, reasons)
+            queued = True
+    return queued
+
+
+async def _analyze_and_alert(
+    entity: str,
+    demo_mode: bool,
+    settings: Dict[str, Any],
+    on_component: Optional[ComponentCallback] = None,
+) -> Dict[str, Any]:
+    result = await run_research_coalesced(entity, demo_mode=demo_mode, settings=settings, on_component=on_component)
+    # Only the caller that actually ran the research queues the alert.
+    if result["coalesced"]:
+        result["telegram_queued"] = False
+        return result
+    with span("stage", stage="telegram_enqueue"):
+        result["telegram_queued"] = await asyncio.to_thread(_queue_alerts, [result], settings)
+    return result
 
 
 @app.route("/api/analyze", methods=["GET"])
@@ -65,25 +238,203 @@ def api_analyze():
     if not entity:
         return jsonify({"error": "Missing query parameter: entity"}), 400
     settings = load_settings()
-    demo_mode = str(request.args.get("demo_mode", "")).lower() in {"1", "true", "yes", "on"}
+    demo_mode = _demo_mode(request.args.get("demo_mode"), settings)
+    want_timings = str(request.args.get("timings", "")).lower() in {"1", "true", "yes", "on"}
     try:
-        result = asyncio.run(run_research(entity, demo_mode=demo_mode, settings=settings))
+        if want_timings:
+            result, timings = run_sync(collect_timings(_analyze_and_alert(entity, demo_mode, settings)))
+            result["timings"] = timings
+        else:
+            result = run_sync(_analyze_and_alert(entity, demo_mode, settings))
     except Exception as exc:
         return jsonify({"error": f"Research failed: {exc}"}), 500
+    return jsonify(result)
 
-    notifier = InvestTelegramAlerts(
-        bot_token=settings.get("telegram_bot_token", ""),
-        chat_id=settings.get("telegram_chat_id", ""),
+
+def _component(name: str):
+    entity = (request.args.get("entity") or "").strip()
+    if not entity:
+        return jsonify({"error": "Missing query parameter: entity"}), 400
+    settings = load_settings()
+    demo_mode = _demo_mode(request.args.get("demo_mode"), settings)
+    try:
+        result = run_sync(run_component(name, entity, demo_mode, settings))
+    except Exception as exc:
+        return jsonify({"error": f"{name.capitalize()} lookup failed: {exc}"}), 500
+    return jsonify({"entity": entity, "mode": "demo" if demo_mode else "real", name: result})
+
+
+@app.route("/api/financials", methods=["GET"])
+def api_financials():
+    return _component("financials")
+
+
+@app.route("/api/founders", methods=["GET"])
+def api_founders():
+    return _component("founders")
+
+
+@app.route("/api/social", methods=["GET"])
+def api_social():
+    return _component("social")
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/api/analyze/stream", methods=["GET"])
+def api_analyze_stream():
+    entity = (request.args.get("entity") or "").strip()
+    if not entity:
+        return jsonify({"error": "Missing query parameter: entity"}), 400
+    settings = load_settings()
+    demo_mode = _demo_mode(request.args.get("demo_mode"), settings)
+    events: "queue.Queue[Optional[tuple]]" = queue.Queue()
+
+    async def job() -> None:
+        try:
+            result = await _analyze_and_alert(entity, demo_mode, settings, lambda name, part: events.put((name, part)))
+            events.put(("result", result))
+        except Exception as exc:
+            events.put(("error", {"error": f"Research failed: {exc}"}))
+        finally:
+            events.put(None)
+
+    submit(job())
+
+    def generate():
+        while True:
+            try:
+                item = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            yield _sse(*item)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    telegram_sent = notifier.send_investment_card(result) if notifier.active else False
-    result["telegram_sent"] = bool(telegram_sent)
-    return jsonify(result)
+
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/analyze/batch", methods=["POST"])
+def api_analyze_batch():
+    payload: Dict[str, Any] = request.get_json(silent=True) or {}
+    entities = payload.get("entities")
+    if not isinstance(entities, list) or not entities:
+        return jsonify({"error": "Missing entities list"}), 400
+    if len(entities) > BATCH_MAX_ENTITIES:
+        return jsonify({"error": f"Too many entities (max {BATCH_MAX_ENTITIES})"}), 400
+    settings = load_settings()
+    demo_mode = _demo_mode(payload.get("demo_mode"), settings)
+    try:
+        items = run_sync(
+            run_research_batch(entities, demo_mode=demo_mode, settings=settings, concurrency=BATCH_CONCURRENCY)
+        )
+    except Exception as exc:
+        return jsonify({"error": f"Batch research failed: {exc}"}), 500
+    # Queued together, the outbox merges these into digest messages.
+    queued = _queue_alerts(items, settings)
+    return jsonify({"items": items, "count": len(items), "telegram_queued": queued})
+
+
+@app.route("/api/coins/search", methods=["GET"])
+def api_coins_search():
+    query = str(request.args.get("q") or "").strip()
+    limit = max(1, min(50, int(_arg_number("limit") or 10)))
+    return jsonify({"items": coin_index.prefix(query, limit), "route": coin_index.route(query), "ready": coin_index.ready})
+
+
+def _arg_list(name: str) -> List[str]:
+    return [v.strip() for v in str(request.args.get(name) or "").split(",") if v.strip()]
+
+
+def _arg_number(name: str) -> Optional[float]:
+    try:
+        value = float(request.args[name])
+    except (KeyError, ValueError):
+        return None
+    # "nan" and "inf" parse as floats but would make int() raise further down.
+    return value if math.isfinite(value) else None
+
+
+def _etag(*parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, separators=(",", ":"), default=str).encode("utf-8")).hexdigest()[:24]
+
+
+def _conditional(tag: str, build) -> Response:
+    # Clients revalidate with If-None-Match; an unchanged store answers without loading any payloads.
+    if request.if_none_match.contains_weak(tag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(tag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.route("/api/results/<path:entity>", methods=["GET"])
+def api_result(entity: str):
+    item = load_result(entity)
+    if item is None:
+        return jsonify({"error": "Not found"}), 404
+    return _conditional(_etag("result", item.get("entity"), item.get("timestamp")), lambda: item)
+
+
+@app.route("/api/history/<path:entity>", methods=["GET"])
+def api_history(entity: str):
+    # history needs numpy; it is imported on the first history request, not at worker boot.
+    from history import DEFAULT_DAYS, DEFAULT_POINTS, DEFAULT_WINDOW, entity_history
+
+    days = max(1.0, min(3650.0, _arg_number("days") or DEFAULT_DAYS))
+    points = max(2, min(2000, int(_arg_number("points") or DEFAULT_POINTS)))
+    window = max(1, min(365, int(_arg_number("window") or DEFAULT_WINDOW)))
+    mode = "demo" if _demo_mode(request.args.get("demo_mode"), load_settings()) else "real"
+    data = entity_history(store, entity, days, points, window, mode)
+    if data is None:
+        return jsonify({"error": "No history"}), 404
+    return jsonify(data)
+
+
+@app.route("/api/history", methods=["GET"])
+def api_history_summary():
+    from history import DEFAULT_DAYS, history_summary
+
+    entities = _arg_list("entities") or store.watchlist()
+    days = max(1.0, min(3650.0, _arg_number("days") or DEFAULT_DAYS))
+    mode = "demo" if _demo_mode(request.args.get("demo_mode"), load_settings()) else "real"
+    items = history_summary(store, entities[:BATCH_MAX_ENTITIES], days, mode)
+    return jsonify({"days": days, "mode": mode, "items": items})
 
 
 @app.route("/api/portfolio", methods=["GET"])
 def api_portfolio():
-    rows = load_results()
-    return jsonify({"items": rows})
+    fields = _arg_list("fields")
+    verdicts = _arg_list("verdict")
+    min_score, max_score = _arg_number("min_score"), _arg_number("max_score")
+    sort = str(request.args.get("sort") or "timestamp")
+    descending = str(request.args.get("order") or "desc").lower() != "asc"
+    limit = _arg_number("limit")
+    limit = None if limit is None else max(1, min(1000, int(limit)))
+    offset = max(0, int(_arg_number("offset") or 0))
+    tag = _etag("portfolio", store.state(), fields, verdicts, min_score, max_score, sort, descending, limit, offset)
+
+    def build() -> Dict[str, Any]:
+        rows, total = store.query(verdicts, min_score, max_score, sort, descending, limit, offset)
+        if fields:
+            rows = [{k: row.get(k) for k in fields} for row in rows]
+        return {"items": rows, "total": total, "offset": offset, "limit": limit}
+
+    return _conditional(tag, build)
 
 
 @app.route("/api/watchlist", methods=["POST"])
@@ -101,6 +452,11 @@ def api_watchlist_get():
     return jsonify({"watchlist": load_watchlist()})
 
 
+@app.route("/api/scheduler", methods=["GET"])
+def api_scheduler():
+    return jsonify(scheduler.status())
+
+
 @app.route("/api/settings", methods=["GET"])
 def api_settings_get():
     cfg = load_settings()
@@ -110,7 +466,10 @@ def api_settings_get():
 @app.route("/api/settings", methods=["POST"])
 def api_settings_set():
     payload: Dict[str, Any] = request.get_json(silent=True) or {}
-    cfg = save_settings(payload)
+    try:
+        cfg = save_settings(payload)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     return jsonify(cfg)
 
 
@@ -125,6 +484,47 @@ def api_test_telegram():
     return jsonify({"ok": bool(ok), "active": notifier.active})
 
 
+# Worker cold-start cost: process creation (or fork) until every module above is imported and storage is ready.
+STARTUP = {"seconds": process_age(), "rss_mb": rss_mb(), "pid": os.getpid()}
+
+
+def profile_startup(top: int = 15) -> Dict[str, Any]:
+    # A fresh interpreter imports the app under -X importtime, so the numbers match a real worker boot.
+    env = dict(os.environ, INVESTAI_SCHEDULER="0", INVESTAI_OUTBOX="0", PYTHONPATH=str(APP_DIR))
+    code = "import json, server; print(json.dumps(server.STARTUP))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=str(APP_DIR), env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "startup failed")
+    imports: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # Children are printed before their parent, two spaces of indent per level.
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 1:
+            pending.append({"module": name.strip(), "seconds": round(int(cumulative) / 1e6, 4)})
+        elif depth == 0:
+            if name.strip() == "server":
+                imports = pending
+            pending = []
+    imports.sort(key=lambda item: item["seconds"], reverse=True)
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    report["imports"] = imports[:top]
+    report["heavy_modules_loaded"] = [m for m in ("numpy", "pandas", "yfinance", "praw") if f" {m}\n" in proc.stderr + "\n"]
+    return report
+
+
 if __name__ == "__main__":
-    ensure_storage()
+    parser = argparse.ArgumentParser(description="InvestAI API server")
+    parser.add_argument("--profile-startup", action="store_true", help="print worker cold-start time/RSS as JSON and exit")
+    args = parser.parse_args()
+    if args.profile_startup:
+        print(json.dumps(profile_startup(), indent=2))
+        raise SystemExit(0)
     app.run(host="0.0.0.0", port=PORT, debug=False)
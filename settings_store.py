@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from alert_rules import AlertRules, parse_rules
+from runtime_config import DATA_DIR
+
+
+SETTINGS_FILE = DATA_DIR / "settings.json"
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off", ""}
+
+
+def _bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("expected a boolean")
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise ValueError("expected a string")
+    return str(value).strip()
+
+
+def _number(cast: Callable[[Any], Any], low: float, high: float) -> Callable[[Any], Any]:
+    def parse(value: Any) -> Any:
+        if isinstance(value, bool):
+            raise ValueError("expected a number")
+        number = cast(float(value))
+        if not low <= number <= high:
+            raise ValueError(f"expected a value between {low:g} and {high:g}")
+        return number
+
+    return parse
+
+
+def _intervals(value: Any) -> Dict[str, float]:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError("expected an object of entity -> seconds")
+    parse = _number(float, 60, 30 * 86400)
+    return {str(k).strip(): parse(v) for k, v in value.items() if str(k).strip()}
+
+
+@dataclass(frozen=True)
+class Settings:
+    demo_mode: bool = False
+    coingecko_api_key: str = ""
+    reddit_client_id: str = ""
+    reddit_client_secret: str = ""
+    reddit_user_agent: str = "InvestAI/1.0"
+    telegram_bot_token: str = ""
+    telegram_chat_id: str = ""
+    watchlist_refresh_enabled: bool = True
+    watchlist_refresh_interval: float = 1800.0
+    watchlist_refresh_jitter: float = 0.1
+    watchlist_refresh_concurrency: int = 4
+    watchlist_refresh_intervals: Dict[str, float] = field(default_factory=dict)
+    alert_rules: Dict[str, Any] = field(default_factory=lambda: AlertRules().to_dict())
+    # Keys this version does not know about are kept so hand edits and newer clients survive a save.
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = dict(self.extra)
+        out.update({f.name: getattr(self, f.name) for f in fields(self) if f.name != "extra"})
+        out["watchlist_refresh_intervals"] = dict(self.watchlist_refresh_intervals)
+        out["alert_rules"] = dict(self.alert_rules)
+        return out
+
+
+PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "demo_mode": _bool,
+    "coingecko_api_key": _text,
+    "reddit_client_id": _text,
+    "reddit_client_secret": _text,
+    "reddit_user_agent": _text,
+    "telegram_bot_token": _text,
+    "telegram_chat_id": _text,
+    "watchlist_refresh_enabled": _bool,
+    "watchlist_refresh_interval": _number(float, 60, 30 * 86400),
+    "watchlist_refresh_jitter": _number(float, 0, 0.5),
+    "watchlist_refresh_concurrency": _number(int, 1, 32),
+    "watchlist_refresh_intervals": _intervals,
+    "alert_rules": lambda value: parse_rules(value).to_dict(),
+}
+
+
+def parse_settings(raw: Dict[str, Any], base: Optional[Settings] = None, strict: bool = True) -> Settings:
+    # strict: reject the whole update (API input); lenient: keep the previous value per bad field (file on disk).
+    base = base or Settings()
+    if not isinstance(raw, dict):
+        if strict:
+            raise ValueError("settings must be a JSON object")
+        return base
+    changes: Dict[str, Any] = {}
+    extra = dict(base.extra)
+    for key, value in raw.items():
+        parse = PARSERS.get(key)
+        if parse is None:
+            if key != "extra":
+                extra[key] = value
+            continue
+        try:
+            changes[key] = parse(value)
+        except (TypeError, ValueError) as exc:
+            if strict:
+                raise ValueError(f"Invalid setting {key}: {exc}") from None
+    return replace(base, extra=extra, **changes)
+
+
+class SettingsStore:
+    def __init__(self, path: Path = SETTINGS_FILE) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._cached: Optional[Tuple[Tuple[int, int], Settings, Dict[str, Any]]] = None
+        self.loads = 0
+
+    def _signature(self) -> Tuple[int, int]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_mtime_ns, st.st_size)
+
+    def ensure(self) -> None:
+        if not self.path.exists():
+            self._write(Settings())
+
+    def _write(self, settings: Settings) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(settings.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _current(self) -> Tuple[Settings, Dict[str, Any]]:
+        # One stat per call; the file is only re-read and re-validated when another process rewrote it.
+        signature = self._signature()
+        cached = self._cached
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+        with self._lock:
+            try:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception:
+                raw = {}
+            settings = parse_settings(raw, strict=False)
+            view = settings.to_dict()
+            self._cached = (signature, settings, view)
+            self.loads += 1
+        return settings, view
+
+    def get(self) -> Settings:
+        return self._current()[0]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self._current()[1])
+
+    def save(self, patch: Dict[str, Any]) -> Settings:
+        settings = parse_settings(patch or {}, self.get())
+        with self._lock:
+            self._write(settings)
+            self._cached = (self._signature(), settings, settings.to_dict())
+        return settings
+
+
+settings_store = SettingsStore()
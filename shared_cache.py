@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from runtime_config import DATA_DIR
+from sqlite_local import ThreadLocalDB
+
+try:
+    import msgpack
+except Exception:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+ENABLED = os.getenv("INVESTAI_SHARED_CACHE", "1").lower() not in {"0", "false", "no", "off"}
+CACHE_FILE = DATA_DIR / "cache.db"
+MAX_ENTRIES = int(os.getenv("INVESTAI_SHARED_CACHE_ENTRIES", "50000"))
+MAX_BYTES = int(os.getenv("INVESTAI_SHARED_CACHE_BYTES", str(64 * 1024 * 1024)))
+EVICT_EVERY = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv(expires_at);
+CREATE INDEX IF NOT EXISTS idx_kv_stored ON kv(stored_at);
+"""
+
+
+def encode(value: Any) -> bytes:
+    # A one-byte tag keeps entries readable by workers with and without msgpack installed.
+    if msgpack is not None:
+        try:
+            return b"m" + msgpack.packb(value, use_bin_type=True)
+        except Exception:
+            pass
+    return b"j" + json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode(blob: bytes) -> Any:
+    tag, body = blob[:1], blob[1:]
+    if tag == b"m":
+        if msgpack is None:
+            raise ValueError("entry was written with msgpack, which is not installed")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body.decode("utf-8"))
+
+
+class SharedCache:
+    def __init__(self, path: Path = CACHE_FILE, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES) -> None:
+        self.path = Path(path)
+        # Losing the last writes on a crash is fine for a cache, so commits skip the fsync.
+        self.db = ThreadLocalDB(self.path, SCHEMA, timeout=5, synchronous="OFF")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.db.conn
+
+    def get(self, ns: str, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            row = self.conn.execute(
+                "SELECT value, stored_at FROM kv WHERE ns = ? AND key = ? AND expires_at > ?",
+                (ns, key, time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return decode(row[0]), float(row[1])
+        except Exception:
+            self.errors += 1
+            return None
+
+    def set(self, ns: str, key: str, value: Any, ttl: float, stored_at: Optional[float] = None) -> None:
+        try:
+            blob = encode(value)
+            stored_at = time.time() if stored_at is None else stored_at
+            self.conn.execute(
+                "INSERT OR REPLACE INTO kv (ns, key, value, stored_at, expires_at, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (ns, key, blob, stored_at, stored_at + ttl, len(blob)),
+            )
+        except Exception:
+            self.errors += 1
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def delete(self, ns: str, key: Optional[str] = None) -> None:
+        try:
+            if key is None:
+                self.conn.execute("DELETE FROM kv WHERE ns = ?", (ns,))
+            else:
+                self.conn.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+        except Exception:
+            self.errors += 1
+
+    def evict(self) -> int:
+        conn = self.conn
+        removed = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            removed += conn.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),)).rowcount
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM kv").fetchone()
+            if count > self.max_entries or size > self.max_bytes:
+                # Oldest first, down to 90% of the bound so eviction does not run on every write.
+                target = min(int(self.max_entries * 0.9), int(count * min(1.0, self.max_bytes * 0.9 / max(1, size))))
+                removed += conn.execute(
+                    "DELETE FROM kv WHERE (ns, key) IN (SELECT ns, key FROM kv ORDER BY stored_at LIMIT ?)",
+                    (max(0, count - target),),
+                ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            self.errors += 1
+            try:
+                conn.execute("ROLLBACK")
+            except Exception:
+                pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM kv").fetchone()
+        except Exception:
+            count, size = None, None
+        return {
+            "enabled": ENABLED,
+            "codec": "msgpack" if msgpack is not None else "json",
+            "entries": count,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+shared_cache: Optional[SharedCache] = SharedCache() if ENABLED else None
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import incr
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+
+@asynccontextmanager
+async def file_lock(path: Path, timeout: float = 60.0, poll: float = 0.05) -> AsyncIterator[bool]:
+    if fcntl is None:
+        yield True
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fh = open(path, "a+")
+    waited = False
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"timed out waiting for {path.name}")
+                waited = True
+                await asyncio.sleep(poll)
+        try:
+            yield waited
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    finally:
+        fh.close()
+
+
+class LeaderLock:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def acquire(self) -> bool:
+        if self._fh is not None:
+            return True
+        if fcntl is None:
+            self._fh = True
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a+")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._fh.close()
+        self._fh = None
+
+
+class SingleFlight:
+    def __init__(self, lock_dir: Path, lock_timeout: float = 60.0) -> None:
+        self.lock_dir = lock_dir
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"leader": 0, "coalesced_local": 0, "coalesced_remote": 0}
+
+    def _lock_path(self, key: Hashable) -> Path:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]
+        return self.lock_dir / f"{digest}.lock"
+
+    async def do(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        reuse: Optional[Callable[[float], Awaitable[Any]]] = None,
+    ) -> Tuple[Any, Optional[str]]:
+        # All callers in a worker share one event loop, so a plain dict of futures dedupes across threads.
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced_local"] += 1
+            incr("singleflight", outcome="coalesced_local")
+            return await asyncio.shield(pending), "local"
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, mode = await self._run_leader(key, factory, reuse)
+            future.set_result(value)
+            return value, mode
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Followers see the exception; mark it retrieved so an unobserved failure is not logged.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_leader(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        reuse: Optional[Callable[[float], Awaitable[Any]]],
+    ) -> Tuple[Any, Optional[str]]:
+        started = time.time()
+        async with file_lock(self._lock_path(key), timeout=self.lock_timeout) as waited:
+            # Another worker held the slot: its freshly saved result is ours too.
+            if waited and reuse is not None:
+                value = await reuse(started)
+                if value is not None:
+                    self.stats["coalesced_remote"] += 1
+                    incr("singleflight", outcome="coalesced_remote")
+                    return value, "remote"
+            self.stats["leader"] += 1
+            incr("singleflight", outcome="leader")
+            return await factory(), None
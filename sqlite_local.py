@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+class ThreadLocalDB:
+    # One WAL connection per thread, never reused across a fork, with the schema applied once per process.
+    def __init__(
+        self,
+        path: Path,
+        schema: str = "",
+        timeout: float = 30.0,
+        synchronous: str = "NORMAL",
+        migrate: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.schema = schema
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.migrate = migrate
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized_pid: Optional[int] = None
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def init(self) -> None:
+        if self._initialized_pid == os.getpid():
+            return
+        with self._init_lock:
+            if self._initialized_pid == os.getpid():
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self.connect()
+            try:
+                if self.migrate is not None:
+                    self.migrate(conn)
+                if self.schema:
+                    conn.executescript(self.schema)
+            finally:
+                conn.close()
+            self._initialized_pid = os.getpid()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            self.init()
+            conn = self.connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
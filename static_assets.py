@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from runtime_config import APP_DIR
+
+try:
+    import brotli
+except Exception:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+ASSETS = ("app.js", "styles.css")
+PAGES = ("index.html", "dashboard.html", "report.html", "settings.html")
+URL_PREFIX = "/static/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Matches ./app.js?v=..., /styles.css, app.js in src/href attributes; the query-string cache busters become obsolete.
+REFERENCE = re.compile(r"""(?P<attr>(?:src|href)=["'])(?:\./|/)?(?P<name>%s)(?:\?[^"']*)?(?P<end>["'])""" % "|".join(
+    re.escape(name) for name in ASSETS
+))
+
+
+def _content_type(name: str) -> str:
+    kind = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"{kind}; charset=utf-8" if kind.startswith("text/") or kind.endswith("javascript") else kind
+
+
+def _encodings(raw: bytes) -> Dict[str, bytes]:
+    # mtime=0 keeps the gzip bytes reproducible, so every worker serves identical bodies for the same source.
+    out = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out["br"] = brotli.compress(raw, quality=11)
+    return out
+
+
+def negotiate(accept_encoding: str, available: Any) -> str:
+    offered: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            offered[token.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and offered.get(encoding, offered.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+class StaticAssets:
+    def __init__(self, src: Path = APP_DIR) -> None:
+        self.src = Path(src)
+        self.manifest: Dict[str, str] = {}
+        self.files: Dict[str, Tuple[str, str, Dict[str, bytes]]] = {}
+
+    def build(self) -> Dict[str, str]:
+        # Content-hashed names change whenever the bytes do, so they can be cached forever. Everything is served
+        # from memory; each worker builds its own copy at startup, so nothing is written to disk.
+        manifest: Dict[str, str] = {}
+        files: Dict[str, Tuple[str, str, Dict[str, bytes]]] = {}
+        for name in ASSETS:
+            raw = (self.src / name).read_bytes()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(raw).hexdigest()[:12]}{ext}"
+            manifest[name] = hashed
+            files[hashed] = (_content_type(name), hashed, _encodings(raw))
+
+        def rewrite(match: "re.Match[str]") -> str:
+            return f"{match.group('attr')}{URL_PREFIX}{manifest[match.group('name')]}{match.group('end')}"
+
+        for page in PAGES:
+            raw = REFERENCE.sub(rewrite, (self.src / page).read_text(encoding="utf-8")).encode("utf-8")
+            files[page] = (_content_type(page), hashlib.sha256(raw).hexdigest()[:16], _encodings(raw))
+        self.manifest, self.files = manifest, files
+        return manifest
+
+    def lookup(self, name: str, accept_encoding: str) -> Optional[Tuple[str, str, str, bytes]]:
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        content_type, etag, encoded = entry
+        encoding = negotiate(accept_encoding, encoded)
+        return content_type, etag, encoding, encoded[encoding]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "brotli": brotli is not None,
+            "manifest": dict(self.manifest),
+            "bytes": {name: {k: len(v) for k, v in entry[2].items()} for name, entry in self.files.items()},
+        }
+
+
+static_assets = StaticAssets()
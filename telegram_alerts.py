@@ -1,11 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
+import threading
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
-import requests
+from async_runtime import http_client, run_sync
+from runtime_config import TELEGRAM_API
+
+
+_UNRESOLVED = object()
+_legacy_lock = threading.Lock()
+_legacy_notifier = _UNRESOLVED
+
+
+def _resolve_legacy_notifier():
+    try:
+        root = Path(__file__).resolve().parents[1]
+        legacy_src = root / "mollbot_startup" / "src"
+        if legacy_src.exists():
+            if str(legacy_src) not in sys.path:
+                sys.path.append(str(legacy_src))
+            from telegram_notifier import TelegramNotifier  # type: ignore
+
+            return TelegramNotifier()
+    except Exception:
+        return None
+    return None
 
 
 class InvestTelegramAlerts:
@@ -15,17 +38,13 @@ class InvestTelegramAlerts:
         self._legacy_notifier = self._load_legacy_notifier()
 
     def _load_legacy_notifier(self):
-        try:
-            root = Path(__file__).resolve().parents[1]
-            legacy_src = root / "mollbot_startup" / "src"
-            if legacy_src.exists():
-                sys.path.append(str(legacy_src))
-                from telegram_notifier import TelegramNotifier  # type: ignore
-
-                return TelegramNotifier()
-        except Exception:
-            return None
-        return None
+        # Resolved once per process; constructing an alerts object is then free.
+        global _legacy_notifier
+        if _legacy_notifier is _UNRESOLVED:
+            with _legacy_lock:
+                if _legacy_notifier is _UNRESOLVED:
+                    _legacy_notifier = _resolve_legacy_notifier()
+        return _legacy_notifier
 
     @property
     def active(self) -> bool:
@@ -33,27 +52,45 @@ class InvestTelegramAlerts:
             return True
         return bool(self.bot_token and self.chat_id)
 
-    def _post(self, text: str) -> bool:
+    async def _post_detailed(self, text: str) -> Tuple[bool, Optional[float]]:
         if not self.bot_token or not self.chat_id:
-            return False
+            return False, None
         try:
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+            url = f"{TELEGRAM_API}/bot{self.bot_token}/sendMessage"
             payload = {"chat_id": self.chat_id, "text": text}
-            resp = requests.post(url, json=payload, timeout=12)
-            return resp.status_code == 200
+            resp = await http_client().post(url, json=payload, timeout=12)
         except Exception:
-            return False
+            return False, None
+        if resp.status_code == 200:
+            return True, None
+        retry_after = None
+        if resp.status_code == 429:
+            try:
+                retry_after = float(resp.json().get("parameters", {}).get("retry_after"))
+            except Exception:
+                retry_after = float(resp.headers.get("Retry-After") or 0) or None
+        return False, retry_after
 
-    def send(self, text: str) -> bool:
+    async def _post_async(self, text: str) -> bool:
+        return (await self._post_detailed(text))[0]
+
+    async def deliver_async(self, text: str) -> Tuple[bool, Optional[float]]:
         if self._legacy_notifier is not None and getattr(self._legacy_notifier, "active", False):
             try:
-                return bool(self._legacy_notifier.send_message(text))
+                return bool(await asyncio.to_thread(self._legacy_notifier.send_message, text)), None
             except Exception:
                 pass
-        return self._post(text)
+        return await self._post_detailed(text)
 
-    def send_investment_card(self, result: Dict) -> bool:
-        text = (
+    async def send_async(self, text: str) -> bool:
+        return (await self.deliver_async(text))[0]
+
+    def send(self, text: str) -> bool:
+        return run_sync(self.send_async(text))
+
+    @staticmethod
+    def format_investment_card(result: Dict, reasons: Optional[List[str]] = None) -> str:
+        card = (
             f"INVESTAI ALERT\n"
             f"Entity: {result.get('entity','?')}\n"
             f"Score: {result.get('score','-')}\n"
@@ -62,8 +99,15 @@ class InvestTelegramAlerts:
             f"Founders: {result.get('founders',{}).get('score','-')}\n"
             f"Social: {result.get('social',{}).get('score','-')}"
         )
-        return self.send(text)
+        if reasons:
+            card += "\nWhy: " + "; ".join(reasons)
+        return card
+
+    async def send_investment_card_async(self, result: Dict) -> bool:
+        return await self.send_async(self.format_investment_card(result))
+
+    def send_investment_card(self, result: Dict) -> bool:
+        return self.send(self.format_investment_card(result))
 
     def send_test(self) -> bool:
         return self.send("InvestAI test message: Telegram channel is connected.")
-
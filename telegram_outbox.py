@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_runtime import run_sync
+from metrics import incr
+from result_store import ResultStore
+from singleflight import LeaderLock
+from telegram_alerts import InvestTelegramAlerts
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot_token TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    last_error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox(status, next_attempt_at);
+"""
+
+MESSAGE_LIMIT = 4000
+LINGER_SECONDS = 2.0
+POLL_SECONDS = 1.0
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = 600.0
+KEEP_SENT_SECONDS = 7 * 86400.0
+
+
+def _chat_interval(chat_id: str) -> float:
+    # Telegram allows ~1 msg/s per private chat and ~20 msg/min per group (negative ids).
+    return 3.0 if str(chat_id).startswith("-") else 1.0
+
+
+def _digest(rows: List[Tuple[int, int, str]]) -> List[Tuple[List[int], str]]:
+    # Each part carries the ids of the rows it covers, so delivery progress is tracked per part.
+    if len(rows) == 1:
+        return [([rows[0][0]], rows[0][2])]
+    header = f"INVESTAI DIGEST ({len(rows)} alerts)"
+    parts: List[Tuple[List[int], str]] = []
+    ids: List[int] = []
+    current = header
+    for row_id, _, text in rows:
+        if ids and len(current) + len(text) + 2 > MESSAGE_LIMIT:
+            parts.append((ids, current))
+            ids, current = [], header + " (cont.)"
+        current += "\n\n" + text
+        ids.append(row_id)
+    parts.append((ids, current))
+    return parts
+
+
+class TelegramOutbox:
+    def __init__(self, store: ResultStore, lock_path: Path) -> None:
+        self.store = store
+        self.lock = LeaderLock(lock_path)
+        self._schema_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_allowed: Dict[Tuple[str, str], float] = {}
+        self._last_purge = 0.0
+
+    def _ensure_schema(self) -> None:
+        if self._schema_pid != os.getpid():
+            self.store.conn.executescript(SCHEMA)
+            self._schema_pid = os.getpid()
+
+    def enqueue(
+        self, result: Dict[str, Any], bot_token: str = "", chat_id: str = "", reasons: Optional[List[str]] = None
+    ) -> int:
+        self._ensure_schema()
+        now = time.time()
+        with self.store.transaction() as conn:
+            cur = conn.execute(
+                """
+                INSERT INTO outbox (bot_token, chat_id, entity, text, created_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    bot_token,
+                    chat_id,
+                    str(result.get("entity") or ""),
+                    InvestTelegramAlerts.format_investment_card(result, reasons),
+                    now,
+                    now + LINGER_SECONDS,
+                ),
+            )
+        incr("telegram_outbox", outcome="enqueued")
+        self._wake.set()
+        return int(cur.lastrowid)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="telegram-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.lock.release()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.lock.acquire():
+                    self.drain()
+            except Exception:
+                pass
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+
+    def _due(self, now: float) -> Dict[Tuple[str, str], List[Tuple[int, int, str]]]:
+        rows = self.store.conn.execute(
+            """
+            SELECT id, bot_token, chat_id, attempts, text FROM outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY id LIMIT 500
+            """,
+            (now,),
+        ).fetchall()
+        groups: Dict[Tuple[str, str], List[Tuple[int, int, str]]] = {}
+        for row_id, token, chat, attempts, text in rows:
+            groups.setdefault((token, chat), []).append((row_id, attempts, text))
+        return groups
+
+    def drain(self) -> int:
+        self._ensure_schema()
+        now = time.time()
+        sent = 0
+        for (token, chat), rows in self._due(now).items():
+            if self._next_allowed.get((token, chat), 0.0) > now:
+                continue
+            notifier = InvestTelegramAlerts(bot_token=token, chat_id=chat)
+            ids = [r[0] for r in rows]
+            if not notifier.active:
+                self._finish(ids, "failed", "telegram not configured")
+                continue
+            ok, retry_after = True, None
+            delivered: List[int] = []
+            for i, (part_ids, text) in enumerate(_digest(rows)):
+                if i:
+                    # A digest split over several messages still respects the per-chat rate.
+                    time.sleep(_chat_interval(chat))
+                ok, retry_after = run_sync(notifier.deliver_async(text))
+                self._next_allowed[(token, chat)] = time.time() + max(_chat_interval(chat), retry_after or 0.0)
+                if not ok:
+                    break
+                # Marked sent part by part: a retry after a later part fails never repeats this one.
+                self._finish(part_ids, "sent")
+                delivered.extend(part_ids)
+                sent += len(part_ids)
+                incr("telegram_outbox", float(len(part_ids)), outcome="sent")
+            if not ok:
+                self._retry([r for r in rows if r[0] not in delivered], retry_after)
+        self._purge(now)
+        return sent
+
+    def _finish(self, ids: List[int], status: str, error: str = "") -> None:
+        with self.store.transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, last_error = ? WHERE id = ?",
+                [(status, error, row_id) for row_id in ids],
+            )
+
+    def _retry(self, rows: List[Tuple[int, int, str]], retry_after: Optional[float]) -> None:
+        now = time.time()
+        updates = []
+        for row_id, attempts, _ in rows:
+            attempts += 1
+            delay = max(retry_after or 0.0, min(MAX_BACKOFF, 2.0 ** attempts))
+            status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+            updates.append((attempts, now + delay, status, "rate limited" if retry_after else "send failed", row_id))
+        with self.store.transaction() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, status = ?, last_error = ? WHERE id = ?",
+                updates,
+            )
+        incr("telegram_outbox", float(len(rows)), outcome="retry")
+
+    def _purge(self, now: float) -> None:
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM outbox WHERE status = 'sent' AND created_at < ?", (now - KEEP_SENT_SECONDS,))
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_schema()
+        rows = self.store.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {"leader": self.lock.held, **{status: count for status, count in rows}}
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+# Point every store at a throwaway data dir before any app module reads runtime_config.
+os.environ["INVESTAI_DATA_DIR"] = tempfile.mkdtemp(prefix="investai-tests-")
+os.environ.setdefault("INVESTAI_SCHEDULER", "0")
+os.environ.setdefault("INVESTAI_OUTBOX", "0")
+os.environ.setdefault("INVESTAI_RATE_LIMIT", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import numpy as np
+
+from backtest import COMPONENTS, run_backtest, synthetic_panel
+
+
+PLANTED = np.array([0.5, 0.2, 0.3])
+
+
+def test_search_recovers_planted_weights():
+    step = 0.05
+    report = run_backtest(None, horizon_days=7, step=step, top=1, panel=synthetic_panel(150, 120))
+    best = np.array([report["best"]["weights"][c] for c in COMPONENTS])
+    assert np.abs(best - PLANTED).max() <= step + 1e-9
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import metrics
+
+
+def _write(pid: int, count: float, age: float = 0.0) -> None:
+    metrics.METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    path = metrics.METRICS_DIR / f"{pid}.json"
+    path.write_text(json.dumps({"hist": {}, "counters": {'["test_hits",[]]': count}}), encoding="utf-8")
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+def test_aggregate_drops_dead_and_stale_workers():
+    metrics.clear()
+    dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    _write(int(dead.stdout), 5)
+    _write(os.getppid(), 7)
+    _write(1, 11, age=metrics.STALE_SECONDS + 60)
+    assert metrics.aggregate()["counters"].get('["test_hits",[]]') == 7
+    # This process's own flusher may have written its snapshot meanwhile.
+    left = {p.name for p in metrics.METRICS_DIR.glob("*.json")} - {f"{os.getpid()}.json"}
+    assert left == {f"{os.getppid()}.json"}
+    metrics.clear()
+    assert not list(metrics.METRICS_DIR.glob(f"{os.getppid()}.json"))
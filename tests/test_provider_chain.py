@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import types
+
+import financial_analyzer
+from provider_chain import get_breaker, provider_step, run_chain
+from providers import registry
+
+
+def test_empty_secondary_does_not_win_hedge(monkeypatch):
+    info = types.SimpleNamespace(info={}, history=lambda period: types.SimpleNamespace(empty=True))
+    monkeypatch.setitem(registry._modules, "yfinance", types.SimpleNamespace(Ticker=lambda ticker: info))
+    assert financial_analyzer._yahoo_lookup("$SC1") is None
+
+    async def slow(timeout):
+        await asyncio.sleep(get_breaker("test-slow").hedge_delay() + 0.3)
+        return {"current_price": 1.5}
+
+    async def chain():
+        meta = {}
+        steps = [
+            provider_step("test-slow", "$SC1", slow, meta),
+            provider_step(
+                "test-yahoo", "$SC1", lambda t: asyncio.to_thread(financial_analyzer._yahoo_lookup, "$SC1"), meta
+            ),
+        ]
+        return await run_chain(steps, mode="hedge"), meta
+
+    (value, provider), meta = asyncio.run(chain())
+    assert provider == "test-slow"
+    assert value == {"current_price": 1.5}
+    # The secondary really was launched as a hedge and came back empty.
+    assert "test-yahoo" in meta
+
+
+def test_failed_step_is_not_cached():
+    calls = []
+
+    async def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise ConnectionError("upstream down")
+        return {"current_price": 2.0}
+
+    async def once():
+        meta = {}
+        return await run_chain([provider_step("test-flaky", "$FL1", flaky, meta)], mode="hedge"), meta
+
+    (value, provider), meta = asyncio.run(once())
+    assert value is None
+    assert meta["test-flaky"] == {"status": "failed", "reason": "error"}
+    # The retry reaches the upstream instead of replaying a cached "no data".
+    (value, provider), meta = asyncio.run(once())
+    assert len(calls) == 2
+    assert (value, provider) == ({"current_price": 2.0}, "test-flaky")
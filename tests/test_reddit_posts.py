@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import types
+
+import sentiment_engine
+from reddit_posts import RedditPostStore
+
+
+NOW = 1_800_000_000.0
+
+
+def test_refreshed_score_updates_aggregate(tmp_path):
+    store = RedditPostStore(tmp_path / "reddit.db", refresh=3600)
+    fresh = [{"id": f"p{i}", "created_utc": NOW - i, "score": 1, "title": f"post {i}"} for i in range(4)]
+    store.ingest("ACME", fresh, full=True, now=NOW)
+    assert store.aggregate("ACME")["ratio"] == 0.0
+
+    # Not due yet; an hour later every stored post is re-read by id.
+    assert store.plan("ACME", now=NOW + 60)[1] == []
+    before, refresh = store.plan("ACME", now=NOW + 3600)
+    assert before == "t3_p0" and sorted(refresh) == ["t3_p0", "t3_p1", "t3_p2", "t3_p3"]
+    grown = [dict(post, score=50) for post in fresh[:3]]
+    store.ingest("ACME", grown, checked=refresh, now=NOW + 3600)
+
+    aggregate = store.aggregate("ACME")
+    assert aggregate["ratio"] == 0.75
+    assert aggregate["sample_size"] == 4
+    assert aggregate["intensity"] == int((151 / 4) / 8 + 0.75 * 40)
+    assert store.plan("ACME", now=NOW + 3700)[1] == []
+
+
+def test_ingest_refreshes_stalest_posts_through_the_provider(tmp_path, monkeypatch):
+    store = RedditPostStore(tmp_path / "reddit.db", refresh=0)
+    monkeypatch.setattr(sentiment_engine, "post_store", store)
+    scores = {"a": 1, "b": 2}
+    calls = []
+
+    async def fetch(before, refresh):
+        calls.append((before, list(refresh)))
+        return [{"id": i, "created_utc": 2e9 - n, "score": s, "title": i} for n, (i, s) in enumerate(scores.items())]
+
+    first = asyncio.run(sentiment_engine._ingest("ACME", "reddit-public", fetch))
+    assert first["ratio"] == 0.0 and first["new_posts"] == 2
+    scores.update(a=90, b=40)
+    second = asyncio.run(sentiment_engine._ingest("ACME", "reddit-public", fetch))
+    assert second["ratio"] == 1.0 and second["new_posts"] == 0
+    assert calls[1] == ("t3_a", ["t3_a", "t3_b"])
+
+
+class _FakeReddit:
+    def __init__(self):
+        self.searches = []
+
+    def subreddit(self, name):
+        fake = self
+
+        class Subreddit:
+            def search(self, query, **kwargs):
+                # Same as praw's _safely_add_arguments: an explicit params=None breaks the copy-and-update.
+                if "params" in kwargs:
+                    kwargs["params"] = dict(kwargs["params"])
+                fake.searches.append(kwargs)
+                return [types.SimpleNamespace(id="x1", created_utc=2e9, score=30, title="hello")]
+
+        return Subreddit()
+
+
+def test_praw_posts_without_marker(monkeypatch):
+    reddit = _FakeReddit()
+
+    @contextlib.contextmanager
+    def client(*args):
+        yield reddit
+
+    monkeypatch.setattr(sentiment_engine.client_pool, "client", client)
+    posts = sentiment_engine._praw_posts("ACME", "id", "secret", "", None, ())
+    assert posts == [{"id": "x1", "created_utc": 2e9, "score": 30, "title": "hello"}]
+    assert "params" not in reddit.searches[0]
+    sentiment_engine._praw_posts("ACME", "id", "secret", "", "t3_x1", ())
+    assert reddit.searches[1]["params"] == {"before": "t3_x1"}
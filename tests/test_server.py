@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+from server import app, static_assets
+
+
+@pytest.fixture()
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/data/settings.json", "/data/investai.db", "/server.py", "/app.js", "/Dockerfile"])
+def test_app_directory_is_not_served(client, path):
+    assert client.get(path).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/", "/index.html", "/dashboard", "/report.html", "/settings"])
+def test_pages_are_served(client, path):
+    assert client.get(path).status_code == 200
+
+
+def test_fingerprinted_assets_are_served(client):
+    for name in static_assets.manifest.values():
+        assert client.get(f"/static/{name}").status_code == 200
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=nan", "limit=inf", "limit=-5", "limit=1e9"])
+def test_bad_search_limit_falls_back(client, query):
+    assert client.get(f"/api/coins/search?q=bt&{query}").status_code == 200
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=inf", "offset=nan", "offset=-inf", "min_score=x"])
+def test_bad_portfolio_numbers_fall_back(client, query):
+    assert client.get(f"/api/portfolio?{query}").status_code == 200
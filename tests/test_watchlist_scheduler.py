@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import research_engine
+from watchlist_scheduler import WatchlistScheduler
+
+
+def test_due_entities_reads_only_watchlist_timestamps(tmp_path, monkeypatch):
+    now = 1_800_000_000.0
+    monkeypatch.setattr(research_engine, "load_results", lambda: (_ for _ in ()).throw(AssertionError("payloads")))
+    research_engine.add_watchlist("  Fresh Coin ")
+    research_engine.add_watchlist("$OLD")
+    research_engine.save_result({"entity": "fresh coin", "timestamp": datetime.fromtimestamp(now - 60).isoformat()})
+    research_engine.save_result({"entity": "$old", "timestamp": datetime.fromtimestamp(now - 7200).isoformat()})
+
+    scheduler = WatchlistScheduler(lock_path=tmp_path / "scheduler.lock")
+    due = scheduler.due_entities({"watchlist_refresh_interval": 1800, "watchlist_refresh_jitter": 0}, now=now)
+    assert [entity for _, entity in due] == ["$OLD"]
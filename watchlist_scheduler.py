@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from async_runtime import run_sync
+from coin_index import DOWNLOAD_TIMEOUT, coin_index
+from rate_limiter import lane
+from research_engine import DATA_DIR, load_result_times, load_settings, load_watchlist, run_research_coalesced
+from result_store import entity_key
+from singleflight import LeaderLock
+
+
+LOCK_FILE = DATA_DIR / "scheduler.lock"
+DEFAULT_INTERVAL = 1800.0
+DEFAULT_JITTER = 0.1
+DEFAULT_CONCURRENCY = 4
+TICK_SECONDS = 15.0
+
+
+def _parse_ts(value: Any) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except Exception:
+        return 0.0
+
+
+class WatchlistScheduler:
+    def __init__(
+        self,
+        tick_seconds: float = TICK_SECONDS,
+        lock_path: Path = LOCK_FILE,
+        on_results: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], Any]] = None,
+    ) -> None:
+        self.tick_seconds = tick_seconds
+        self.on_results = on_results
+        self.lock = LeaderLock(lock_path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._jitter: Dict[Tuple[str, float], float] = {}
+        self.last_run: Optional[float] = None
+        self.last_refreshed: List[str] = []
+        self.last_error: str = ""
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="watchlist-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.lock.release()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.lock.acquire():
+                    # The leader keeps the coin list fresh so request paths never wait on the download.
+                    run_sync(coin_index.ensure(wait=DOWNLOAD_TIMEOUT))
+                    self.run_once()
+            except Exception as exc:
+                self.last_error = str(exc)
+            self._stop.wait(self.tick_seconds)
+
+    def _interval_for(self, entity: str, settings: Dict[str, Any]) -> float:
+        overrides = settings.get("watchlist_refresh_intervals") or {}
+        for name, value in overrides.items():
+            if entity_key(name) == entity_key(entity):
+                return max(60.0, float(value))
+        return max(60.0, float(settings.get("watchlist_refresh_interval") or DEFAULT_INTERVAL))
+
+    def _jittered(self, key: str, last_ts: float, interval: float, jitter: float) -> float:
+        slot = (key, last_ts)
+        if slot not in self._jitter:
+            self._jitter[slot] = random.uniform(-jitter, jitter) * interval
+        return interval + self._jitter[slot]
+
+    def due_entities(self, settings: Dict[str, Any], now: Optional[float] = None) -> List[Tuple[float, str]]:
+        now = time.time() if now is None else now
+        jitter = max(0.0, min(0.5, float(settings.get("watchlist_refresh_jitter", DEFAULT_JITTER))))
+        watchlist = load_watchlist()
+        last_seen = load_result_times(watchlist)
+        due: List[Tuple[float, str]] = []
+        live_slots = set()
+        for entity in watchlist:
+            key = entity_key(entity)
+            last_ts = _parse_ts(last_seen.get(key))
+            live_slots.add((key, last_ts))
+            if now - last_ts >= self._jittered(key, last_ts, self._interval_for(entity, settings), jitter):
+                due.append((last_ts, entity))
+        self._jitter = {k: v for k, v in self._jitter.items() if k in live_slots}
+        due.sort()
+        return due
+
+    def run_once(self) -> List[str]:
+        settings = load_settings()
+        if not settings.get("watchlist_refresh_enabled", True):
+            return []
+        due = [entity for _, entity in self.due_entities(settings)]
+        if not due:
+            return []
+        concurrency = max(1, int(settings.get("watchlist_refresh_concurrency") or DEFAULT_CONCURRENCY))
+        run_sync(self._refresh(due, settings, concurrency))
+        self.last_run = time.time()
+        self.last_refreshed = due
+        return due
+
+    async def _refresh(self, entities: List[str], settings: Dict[str, Any], concurrency: int) -> None:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(entity: str) -> Optional[Dict[str, Any]]:
+            async with sem:
+                try:
+                    # Coalesced with any user request already researching the same entity.
+                    return await run_research_coalesced(entity, settings=settings)
+                except Exception as exc:
+                    self.last_error = f"{entity}: {exc}"
+                    return None
+
+        # Oldest results were sorted first, so they claim the semaphore first.
+        with lane("background"):
+            results = [r for r in await asyncio.gather(*(one(e) for e in entities)) if r is not None]
+        if results and self.on_results is not None:
+            # Refreshed results go through the alert rules too; unchanged ones stay silent.
+            try:
+                await asyncio.to_thread(self.on_results, results, settings)
+            except Exception as exc:
+                self.last_error = f"alerts: {exc}"
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "leader": self.lock.held,
+            "pid": os.getpid(),
+            "last_run": self.last_run,
+            "last_refreshed": self.last_refreshed,
+            "last_error": self.last_error,
+        }